@@ -1,19 +1,78 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Request, request, jsonify, render_template, send_from_directory, Response
 import os
+import tempfile
 import pandas as pd
-from werkzeug.utils import secure_filename
 from parser.tally_parser_interunit_loan_recon import parse_tally_file
+import config
 import database
+import ledger_cache
+import metrics
+import sql_trace
+
+class UploadRequest(Request):
+    """Request that keeps multipart uploads in memory up to UPLOAD_MEMORY_LIMIT
+
+    Werkzeug's default stream factory writes any upload over 500 KB to a
+    temp file while parsing the form. Uploads over the limit still spill to
+    an anonymous temp file, deleted on close, so concurrent uploads never
+    share a path.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=config.UPLOAD_MEMORY_LIMIT)
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 
-# Create upload folder
+# Create export folder (uploads are parsed in memory and never stored here)
 os.makedirs('uploads', exist_ok=True)
 
+if config.SQL_TRACE_ENABLED:
+    @app.before_request
+    def start_sql_trace():
+        sql_trace.begin_request(request.endpoint)
+
+    @app.after_request
+    def add_sql_trace_header(response):
+        summary = sql_trace.end_request()
+        if summary:
+            response.headers['X-DB-Summary'] = summary.header_value()
+        return response
+
+def refresh_ledger_cache():
+    """Apply the latest changes to the matcher's ledger cache"""
+    if config.MATCH_STREAMING:
+        # Streaming runs read from the database; loading the cache would undo the memory bound
+        return
+    try:
+        ledger_cache.store.refresh()
+    except Exception as e:
+        # The next reconcile refreshes again, so this only delays the update
+        print(f"Error refreshing ledger cache: {e}")
+
 def allowed_file(filename):
     """Check if file is Excel"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'xlsx', 'xls'}
 
+def versioned_json(build):
+    """Serve build() as JSON tagged with the data change version
+
+    A client whose If-None-Match carries the current version gets a 304
+    without the payload being queried.
+    """
+    version = database.get_data_version()
+    if version is None:
+        return jsonify(build())
+    etag = f'data-v{version}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Browsers must revalidate, so fetch() transparently reuses the cached body on 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/')
 def index():
     """Main page"""
@@ -35,17 +94,16 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Please upload Excel files only'}), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join('uploads', filename)
-        file.save(filepath)
-        
-        # Parse file
-        df = parse_tally_file(filepath, sheet_name)
+        # The form parser already buffered the upload (see UploadRequest)
+        timings = {}
+        with metrics.timed('parse_tally_file'):
+            df = parse_tally_file(file.stream, sheet_name, timings)
+        metrics.observe_stages(timings, 'parse_tally_file')
+        metrics.count_rows('parse_tally_file', len(df))
         
         # Save to database
         if database.save_data(df):
-            os.remove(filepath)
+            refresh_ledger_cache()
             return jsonify({
                 'message': 'File processed successfully',
                 'rows_processed': len(df)
@@ -58,15 +116,42 @@ def upload_file():
 
 @app.route('/api/data', methods=['GET'])
 def get_data():
-    """Get all data"""
+    """Get all data, or one page of it with offset/limit"""
     try:
-        data = database.get_data()
-        # Get column order from database
-        column_order = database.get_column_order()
-        return jsonify({
-            'data': data,
-            'column_order': column_order
-        })
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        
+        def build():
+            data = database.get_data(limit=limit, offset=offset)
+            # Get column order from database
+            column_order = database.get_column_order()
+            total = database.count_data() if limit is not None else len(data)
+            return {
+                'data': data,
+                'column_order': column_order,
+                'total': total,
+                'offset': offset
+            }
+        
+        return versioned_json(build)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/data/changes', methods=['GET'])
+def get_data_changes():
+    """Get rows changed, and uids of rows removed, since a data version"""
+    try:
+        since = request.args.get('since', type=int)
+        if since is None:
+            return jsonify({'error': 'since is required'}), 400
+        
+        # Read the version first so no change is missed between the two queries
+        version = database.get_data_version()
+        rows = database.get_changed_data(since)
+        # Archived rows no longer exist in tally_data; clients drop them by uid
+        removed = database.get_removed_uids(since)
+        return jsonify({'version': version, 'since': since, 'data': rows, 'removed': removed})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -75,8 +160,7 @@ def get_data():
 def get_filters():
     """Get filter options"""
     try:
-        filters = database.get_filters()
-        return jsonify(filters)
+        return versioned_json(database.get_filters)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -111,18 +195,43 @@ def export_data():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/summary', methods=['GET'])
+def get_summary():
+    """Outstanding unmatched debit/credit per lender, borrower and statement period"""
+    try:
+        filters = {key: request.args.get(key) for key in ('lender', 'borrower', 'statement_year', 'statement_month')}
+        
+        def build():
+            summary = database.get_unmatched_summary(filters)
+            totals = {
+                'unmatched_debit': round(sum(row['unmatched_debit'] for row in summary), 2),
+                'unmatched_credit': round(sum(row['unmatched_credit'] for row in summary), 2),
+                'unmatched_rows': sum(row['unmatched_rows'] for row in summary)
+            }
+            return {'summary': summary, 'totals': totals}
+        
+        return versioned_json(build)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/reconcile', methods=['POST'])
 def reconcile_transactions():
     """Reconcile interunit transactions"""
     try:
-        # Get all unmatched transactions
-        data = database.get_unmatched_data()
-        
-        # Perform matching logic
-        matches = database.find_matches(data)
+        if config.MATCH_STREAMING:
+            # Merge amount-ordered streams straight from the database
+            matches = database.find_matches_streaming()
+        else:
+            # Bring the in-memory unmatched ledger up to date (reads only rows changed since the last refresh)
+            ledger_cache.store.refresh()
+            
+            # Perform matching logic
+            matches = ledger_cache.store.find_matches()
         
-        # Update database with matches
-        database.update_matches(matches)
+        # Update database with matches; only one pair per row is kept
+        matches = database.update_matches(matches)
+        refresh_ledger_cache()
         
         return jsonify({
             'message': 'Reconciliation completed',
@@ -134,10 +243,17 @@ def reconcile_transactions():
 
 @app.route('/api/matches', methods=['GET'])
 def get_matches():
-    """Get matched transactions"""
+    """Get matched transactions, or one page of them with offset/limit"""
     try:
-        matches = database.get_matched_data()
-        return jsonify({'matches': matches})
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        
+        def build():
+            matches = database.get_matched_data(limit=limit, offset=offset)
+            total = database.count_matched_data() if limit is not None else len(matches)
+            return {'matches': matches, 'total': total, 'offset': offset}
+        
+        return versioned_json(build)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -146,8 +262,7 @@ def get_matches():
 def get_pending_matches():
     """Get matches that need user confirmation"""
     try:
-        matches = database.get_pending_matches()
-        return jsonify({'matches': matches})
+        return versioned_json(lambda: {'matches': database.get_pending_matches()})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -156,8 +271,21 @@ def get_pending_matches():
 def get_confirmed_matches():
     """Get confirmed matches"""
     try:
-        matches = database.get_confirmed_matches()
-        return jsonify({'matches': matches})
+        return versioned_json(lambda: {'matches': database.get_confirmed_matches()})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/archived-matches', methods=['GET'])
+def get_archived_matches():
+    """Get confirmed matches moved to the archive, optionally one page with offset/limit"""
+    try:
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        return versioned_json(lambda: {
+            'matches': database.get_archived_matches(limit=limit, offset=offset),
+            'offset': offset
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -176,6 +304,7 @@ def accept_match():
         success = database.update_match_status(tally_uid, 'confirmed', confirmed_by)
         
         if success:
+            refresh_ledger_cache()
             return jsonify({'message': 'Match accepted successfully'})
         else:
             return jsonify({'error': 'Failed to accept match'}), 500
@@ -197,6 +326,7 @@ def reject_match():
         success = database.update_match_status(tally_uid, 'rejected', confirmed_by)
         
         if success:
+            refresh_ledger_cache()
             return jsonify({'message': 'Match rejected successfully'})
         else:
             return jsonify({'error': 'Failed to reject match'}), 500
@@ -204,5 +334,11 @@ def reject_match():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Stage timings and row counters in Prometheus format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see wsgi.py)
+    app.run(debug=config.DEBUG, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""Headless batch reconciliation.
+
+Parses every Tally export in a directory, loads the rows into the
+database, reconciles all unit pairs and writes an Excel report. Runs
+without the Flask server, e.g. for month-end runs and cron jobs:
+
+    python batch_recon.py Input_Files --jobs 4 --output report.xlsx
+
+Confirmed matches of closed statement periods can be moved to the
+archive tables on their own, e.g. after month-end sign-off:
+
+    python batch_recon.py --archive-before 2024-07
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from parser.tally_parser_interunit_loan_recon import parse_tally_file
+import config
+import database
+import ledger_cache
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+
+def find_statement_files(directory):
+    """List Excel files in a directory, skipping Office lock files"""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(EXCEL_EXTENSIONS) and not name.startswith('~$')
+    )
+
+
+def parse_statement_file(file_path, sheet_name=None):
+    """Parse one workbook; without a sheet name every sheet with a Tally header is parsed"""
+    if sheet_name:
+        sheet_names = [sheet_name]
+    else:
+        wb = load_workbook(file_path, read_only=True)
+        sheet_names = wb.sheetnames
+        wb.close()
+
+    frames = []
+    errors = []
+    for name in sheet_names:
+        try:
+            frames.append(parse_tally_file(file_path, name))
+        except ValueError as e:
+            # Sheets without a Tally header row are not ledgers
+            if sheet_name:
+                errors.append(f"{file_path} [{name}]: {e}")
+        except Exception as e:
+            errors.append(f"{file_path} [{name}]: {e}")
+    return frames, errors
+
+
+def parse_statements(files, sheet_name=None, jobs=1):
+    """Parse statement files, in parallel worker processes when jobs > 1"""
+    frames = []
+    errors = []
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(parse_statement_file, files, [sheet_name] * len(files))
+            for file_frames, file_errors in results:
+                frames.extend(file_frames)
+                errors.extend(file_errors)
+    else:
+        for file_path in files:
+            file_frames, file_errors = parse_statement_file(file_path, sheet_name)
+            frames.extend(file_frames)
+            errors.extend(file_errors)
+    return frames, errors
+
+
+def reconcile_all_pairs(streaming=False):
+    """Match unmatched rows for every unit pair; returns the matches that were stored
+
+    With streaming, rows are merged from amount-ordered database cursors
+    instead of being loaded into the ledger cache.
+    """
+    if streaming:
+        unit_pairs = database.get_unit_pairs()
+        find_matches = database.find_matches_streaming
+    else:
+        store = ledger_cache.store
+        store.refresh()
+        unit_pairs = store.unit_pairs()
+        find_matches = store.find_matches
+
+    matches = []
+    for lender, borrower in unit_pairs:
+        for match in find_matches(lender, borrower):
+            match['lender'] = lender
+            match['borrower'] = borrower
+            matches.append(match)
+    # Only the pairs kept by one-to-one selection are stored and reported
+    return database.update_matches(matches)
+
+
+def export_report(output_path, matches, streaming=False):
+    """Write matched pairs, remaining unmatched rows and a per-pair summary
+
+    With streaming, the workbook is written in openpyxl's write-only mode
+    and the Unmatched sheet is filled chunk by chunk from the database.
+    """
+    matched = pd.DataFrame(database.get_matched_data())
+
+    summary = pd.DataFrame(matches, columns=['lender', 'borrower', 'match_type'])
+    summary = summary.groupby(['lender', 'borrower', 'match_type']).size().reset_index(name='matches')
+
+    if streaming:
+        wb = Workbook(write_only=True)
+        for title, frame in (('Summary', summary), ('Matched', matched)):
+            ws = wb.create_sheet(title)
+            ws.append(list(frame.columns))
+            for row in frame.astype(object).where(frame.notna(), None).itertuples(index=False):
+                ws.append(list(row))
+        ws = wb.create_sheet('Unmatched')
+        ws.append(list(database.UNMATCHED_EXPORT_COLUMNS))
+        for rows in database.iter_unmatched_rows():
+            for row in rows:
+                ws.append(row)
+        wb.save(output_path)
+        return
+
+    unmatched = pd.DataFrame(database.get_unmatched_data())
+    with pd.ExcelWriter(output_path) as writer:
+        summary.to_excel(writer, sheet_name='Summary', index=False)
+        matched.to_excel(writer, sheet_name='Matched', index=False)
+        unmatched.to_excel(writer, sheet_name='Unmatched', index=False)
+
+
+def statement_period(value):
+    """argparse type for YYYY-MM"""
+    try:
+        period = pd.Period(value, freq='M')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+    return period.year, period.month
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Batch interunit loan reconciliation')
+    arg_parser.add_argument('directory', nargs='?', help='Directory containing Tally Excel exports')
+    arg_parser.add_argument('--sheet', help='Sheet name to parse (default: every sheet with a Tally header)')
+    arg_parser.add_argument('--jobs', '-j', type=int, default=1, help='Number of parallel parser processes')
+    arg_parser.add_argument('--output', '-o', help='Report path (default: reconciliation_report_<timestamp>.xlsx)')
+    arg_parser.add_argument('--skip-load', action='store_true', help='Reconcile rows already in the database without parsing')
+    arg_parser.add_argument('--stream', action='store_true', default=config.MATCH_STREAMING,
+                            help='Match over amount-ordered database cursors with bounded memory')
+    arg_parser.add_argument('--migrate-pairs', action='store_true',
+                            help='Copy matches recorded only in matched_with into reconciliation_pairs first')
+    arg_parser.add_argument('--archive-before', type=statement_period, metavar='YYYY-MM',
+                            help='Archive confirmed matches of statement periods before this month')
+    arg_parser.add_argument('--rebuild-summary', action='store_true',
+                            help='Recompute the unmatched balance summary from tally_data')
+    args = arg_parser.parse_args(argv)
+
+    if args.migrate_pairs:
+        print(f"Migrated {database.migrate_matched_with_to_pairs()} matches to reconciliation_pairs")
+    if args.archive_before:
+        print(f"Archived {database.archive_closed_periods(args.archive_before)} confirmed matches")
+    if args.rebuild_summary:
+        print(f"Rebuilt {database.rebuild_unmatched_summary()} summary rows")
+    if args.directory is None and not args.skip_load:
+        if args.migrate_pairs or args.archive_before or args.rebuild_summary:
+            return 0
+        arg_parser.error('directory is required unless --skip-load or a maintenance option is given')
+
+    if not args.skip_load:
+        files = find_statement_files(args.directory)
+        if not files:
+            print(f"No Excel files found in {args.directory}")
+            return 1
+
+        frames, errors = parse_statements(files, args.sheet, max(1, args.jobs))
+        for error in errors:
+            print(f"Error: {error}")
+        if not frames:
+            print("No ledgers parsed")
+            return 1
+
+        df = pd.concat(frames, ignore_index=True)
+        print(f"Parsed {len(frames)} ledgers ({len(df)} rows) from {len(files)} files")
+        if not database.save_data(df):
+            print("Failed to save data")
+            return 1
+
+    matches = reconcile_all_pairs(args.stream)
+    print(f"Reconciliation completed: {len(matches)} matches found")
+
+    output_path = args.output or f"reconciliation_report_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    export_report(output_path, matches, args.stream)
+    print(f"Report saved as {output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,35 @@
+import os
+
 # Database settings
 MYSQL_USER = 'interunit_loan_recon_user'
 MYSQL_PASSWORD = 'abc123'
 MYSQL_HOST = 'localhost'
-MYSQL_DB = 'interunit_loan_recon_db' 
\ No newline at end of file
+MYSQL_DB = 'interunit_loan_recon_db' 
+
+# Storage backend: 'mysql' (server) or 'sqlite' (embedded file, for offline bulk runs)
+DB_BACKEND = 'mysql'
+SQLITE_PATH = 'interunit_loan_recon.db'
+
+# SQL tracing: per-statement latency, slow-query log and a per-request
+# X-DB-Summary response header. Off by default.
+SQL_TRACE_ENABLED = False
+SQL_SLOW_QUERY_MS = 200
+SQL_SLOW_QUERY_LOG = 'slow_queries.log'
+
+# Fuzzy PO/L/C reference matching: same-amount pairs whose references
+# differ by up to this many swapped adjacent characters (5023 vs 5032)
+# match as 'fuzzy_reference'. 0 disables it.
+FUZZY_REFERENCE_MAX_SWAPS = 1
+
+# Flask debugger for the development server (python app.py); never under gunicorn
+DEBUG = os.environ.get('FLASK_DEBUG', '') == '1'
+
+# Uploads up to this size are parsed straight from memory; larger ones
+# spill to an anonymous temp file
+UPLOAD_MEMORY_LIMIT = 32 * 1024 * 1024
+
+# Matching mode: False matches from the in-memory ledger cache; True
+# streams unmatched rows from the database ordered by amount, bounding
+# memory by the largest amount bucket (for very large ledgers)
+MATCH_STREAMING = False
+MATCH_STREAM_CHUNK_ROWS = 5000
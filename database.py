@@ -1,61 +1,220 @@
-from sqlalchemy import create_engine, inspect, text
+import calendar
+from itertools import groupby
+from sqlalchemy import bindparam, text
 import pandas as pd
-from config import MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_DB
+import config
+import metrics
+import reference_index
+import sql_trace
+import storage
 
-engine = create_engine(
-    f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
-)
+# Storage backend (MySQL or embedded SQLite) selected in config.DB_BACKEND
+backend = storage.get_backend()
+engine = backend.engine
+
+if config.SQL_TRACE_ENABLED:
+    sql_trace.install(engine)
 
 def ensure_table_exists(table_name):
-    inspector = inspect(engine)
-    if table_name not in inspector.get_table_names():
-        raise Exception(
-            f"Table '{table_name}' does not exist. Please create it manually in MySQL before uploading."
-        )
+    backend.ensure_table_exists(table_name)
+
+def _bump_version(conn):
+    """Increment the data change version inside the caller's transaction"""
+    conn.execute(text("UPDATE data_version SET version = version + 1 WHERE id = 1"))
+    return conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+
+def get_data_version():
+    """Get the current data change version, or None if it is unavailable"""
+    try:
+        ensure_table_exists('data_version')
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+    except Exception as e:
+        print(f"Error getting data version: {e}")
+        return None
+
+# Unmatched rows aggregated per (lender, borrower, statement year, month)
+SUMMARY_GROUP = ('lender', 'borrower', 'statement_year', 'statement_month')
+SUMMARY_SELECT = """
+    SELECT COALESCE(lender, ''), COALESCE(borrower, ''),
+           COALESCE(statement_year, ''), COALESCE(statement_month, ''),
+           SUM(COALESCE(Debit, 0)), SUM(COALESCE(Credit, 0)), COUNT(*), {now}
+    FROM tally_data
+    WHERE (match_status = 'unmatched' OR match_status IS NULL)
+"""
+SUMMARY_INSERT = """
+    INSERT INTO unmatched_summary
+        (lender, borrower, statement_year, statement_month,
+         unmatched_debit, unmatched_credit, unmatched_rows, updated_at)
+"""
+
+def _summary_groups_of(conn, uids, chunk_size=1000):
+    """Summary groups containing the given rows"""
+    groups = set()
+    uids = list(uids)
+    for start in range(0, len(uids), chunk_size):
+        result = conn.execute(text("""
+            SELECT DISTINCT lender, borrower, statement_year, statement_month
+            FROM tally_data WHERE tally_uid IN :uids
+        """).bindparams(bindparam('uids', expanding=True)), {'uids': uids[start:start + chunk_size]})
+        groups.update(tuple(value or '' for value in row) for row in result)
+    return groups
+
+def _refresh_summary(conn, groups):
+    """Recompute the summary rows of the given groups inside the caller's transaction
+
+    Only the groups touched by a change are re-aggregated, each through
+    the (lender, statement_year, statement_month) index, so the cost
+    follows the size of the change rather than of the table.
+    """
+    if not groups:
+        return
+    params = [dict(zip(SUMMARY_GROUP, group)) for group in groups]
+    conn.execute(text("""
+        DELETE FROM unmatched_summary
+        WHERE lender = :lender AND borrower = :borrower
+        AND statement_year = :statement_year AND statement_month = :statement_month
+    """), params)
+    
+    # Group keys are COALESCEd to '' like in _rebuild_summary. A non-empty key
+    # only matches equal values, so plain equality can use the index; keys
+    # that are '' must also pick up NULLs and go through COALESCE.
+    indexed = [p for p in params if p['lender'] and p['statement_year'] and p['statement_month']]
+    blank = [p for p in params if not (p['lender'] and p['statement_year'] and p['statement_month'])]
+    for group_params, where in (
+        (indexed, "lender = :lender AND statement_year = :statement_year AND statement_month = :statement_month"),
+        (blank, "COALESCE(lender, '') = :lender AND COALESCE(statement_year, '') = :statement_year"
+                " AND COALESCE(statement_month, '') = :statement_month"),
+    ):
+        if not group_params:
+            continue
+        conn.execute(text(SUMMARY_INSERT + SUMMARY_SELECT.format(now=backend.now_sql) + f"""
+            AND {where}
+            AND COALESCE(borrower, '') = :borrower
+            GROUP BY COALESCE(lender, ''), COALESCE(borrower, ''),
+                     COALESCE(statement_year, ''), COALESCE(statement_month, '')
+        """), group_params)
+
+def _rebuild_summary(conn):
+    conn.execute(text("DELETE FROM unmatched_summary"))
+    conn.execute(text(SUMMARY_INSERT + SUMMARY_SELECT.format(now=backend.now_sql) + """
+        GROUP BY COALESCE(lender, ''), COALESCE(borrower, ''),
+                 COALESCE(statement_year, ''), COALESCE(statement_month, '')
+    """))
+
+def rebuild_unmatched_summary():
+    """Recompute the whole summary table, e.g. after creating it on an existing database"""
+    ensure_table_exists('unmatched_summary')
+    with engine.begin() as conn:
+        _rebuild_summary(conn)
+        return conn.execute(text("SELECT COUNT(*) FROM unmatched_summary")).scalar()
+
+def get_unmatched_summary(filters=None):
+    """Outstanding unmatched debit/credit per lender, borrower and statement period"""
+    ensure_table_exists('unmatched_summary')
+    sql = """
+        SELECT lender, borrower, statement_year, statement_month,
+               unmatched_debit, unmatched_credit, unmatched_rows, updated_at
+        FROM unmatched_summary
+    """
+    params = {}
+    conditions = []
+    for key in SUMMARY_GROUP:
+        if filters and filters.get(key):
+            conditions.append(f"{key} = :{key}")
+            params[key] = filters[key]
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY lender, borrower, statement_year, statement_month"
+    
+    with engine.connect() as conn:
+        records = []
+        for row in conn.execute(text(sql), params):
+            record = dict(row._mapping)
+            record['unmatched_debit'] = float(record['unmatched_debit'] or 0)
+            record['unmatched_credit'] = float(record['unmatched_credit'] or 0)
+            records.append(record)
+        return records
+
+@metrics.instrumented('save_data')
+def _archived_uids(conn, uids, chunk_size=1000):
+    """uids among the given ones that were already moved to tally_data_archive"""
+    archived = []
+    uids = list(uids)
+    for start in range(0, len(uids), chunk_size):
+        result = conn.execute(text("""
+            SELECT tally_uid FROM tally_data_archive WHERE tally_uid IN :uids
+        """).bindparams(bindparam('uids', expanding=True)), {'uids': uids[start:start + chunk_size]})
+        archived.extend(row.tally_uid for row in result)
+    return archived
 
 def save_data(df):
     """Save DataFrame to database"""
     try:
         ensure_table_exists('tally_data')
+        ensure_table_exists('data_version')
+        ensure_table_exists('unmatched_summary')
+        ensure_table_exists('tally_data_archive')
         
         # Replace NaN values with None before saving
         df = df.replace({pd.NA: None, pd.NaT: None})
         df = df.where(pd.notnull(df), None)
         
-        df.to_sql('tally_data', engine, if_exists='append', index=False)
+        # Rows, the version bump and the summary update commit together
+        with engine.begin() as conn:
+            # UNIQUE(tally_uid) on tally_data rejects a statement loaded twice;
+            # rows already archived must not come back as open items either
+            archived = _archived_uids(conn, df['tally_uid'])
+            if archived:
+                raise ValueError(
+                    f"{len(archived)} rows were already reconciled and archived "
+                    f"(e.g. {archived[0]}); this statement was loaded before"
+                )
+            df = df.assign(row_version=_bump_version(conn))
+            backend.insert_dataframe(df, 'tally_data', conn)
+            groups = df.reindex(columns=list(SUMMARY_GROUP)).fillna('').astype(str)
+            _refresh_summary(conn, set(groups.itertuples(index=False, name=None)))
+        metrics.count_rows('save_data', len(df))
         return True
     except Exception as e:
         print(f"Error saving data: {e}")
         return False
 
-def get_data(filters=None):
-    """Get data from database"""
+def _filter_clause(filters):
+    """Build a WHERE clause and parameters from column filters"""
+    conditions = []
+    params = {}
+    if filters:
+        for key, value in filters.items():
+            if value:
+                conditions.append(f"{key} = :{key}")
+                params[key] = value
+    if conditions:
+        return " WHERE " + " AND ".join(conditions), params
+    return "", params
+
+def get_data(filters=None, limit=None, offset=0):
+    """Get data from database, optionally one page of it"""
     try:
         ensure_table_exists('tally_data')
         
         # Get column order from database
-        with engine.connect() as conn:
-            result = conn.execute(text("SHOW COLUMNS FROM tally_data"))
-            columns = [row[0] for row in result]
+        columns = backend.get_columns('tally_data')
         
         # Build SQL with explicit column order
         column_list = ", ".join(columns)
-        sql = f"SELECT {column_list} FROM tally_data"
-        params = []
+        where, params = _filter_clause(filters)
+        sql = f"SELECT {column_list} FROM tally_data" + where
         
-        if filters:
-            conditions = []
-            for key, value in filters.items():
-                if value:
-                    conditions.append(f"{key} = %s")
-                    params.append(value)
-            
-            if conditions:
-                sql += " WHERE " + " AND ".join(conditions)
+        # id keeps the order stable between pages
+        sql += " ORDER BY Date DESC, id DESC"
         
-        sql += " ORDER BY Date DESC"
+        if limit is not None:
+            sql += " LIMIT :limit OFFSET :offset"
+            params['limit'] = int(limit)
+            params['offset'] = int(offset or 0)
         
-        df = pd.read_sql(sql, engine, params=params)
+        df = pd.read_sql(text(sql), engine, params=params)
         
         # Convert to records and handle NaN values
         records = df.to_dict('records')
@@ -71,6 +230,63 @@ def get_data(filters=None):
         print(f"Error getting data: {e}")
         return []
 
+def count_data(filters=None):
+    """Count rows matching the filters"""
+    try:
+        ensure_table_exists('tally_data')
+        where, params = _filter_clause(filters)
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM tally_data" + where), params).scalar()
+    except Exception as e:
+        print(f"Error counting data: {e}")
+        return 0
+
+def get_changed_data(since_version):
+    """Get rows changed after the given data version"""
+    try:
+        ensure_table_exists('tally_data')
+        columns = backend.get_columns('tally_data')
+        sql = f"""
+        SELECT {", ".join(columns)} FROM tally_data
+        WHERE row_version > :since
+        ORDER BY row_version, id
+        """
+        df = pd.read_sql(text(sql), engine, params={'since': int(since_version)})
+        records = df.to_dict('records')
+        for record in records:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = None
+        return records
+    except Exception as e:
+        print(f"Error getting changed data: {e}")
+        return []
+
+def get_removed_uids(since_version):
+    """uids of rows removed from tally_data after the given data version"""
+    try:
+        ensure_table_exists('tally_data_removed')
+        with engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT tally_uid FROM tally_data_removed
+                WHERE row_version > :since
+                ORDER BY row_version, tally_uid
+            """), {'since': int(since_version)})
+            return [row.tally_uid for row in result]
+    except Exception as e:
+        print(f"Error getting removed rows: {e}")
+        return []
+
+def get_ledger_rows(since_version=None):
+    """Get the columns the matcher needs, for unmatched rows or for every row changed after since_version"""
+    ensure_table_exists('tally_data')
+    columns = "id, tally_uid, lender, borrower, Date, Debit, Credit, Particulars, match_status"
+    if since_version is None:
+        sql = f"SELECT {columns} FROM tally_data WHERE match_status = 'unmatched' OR match_status IS NULL"
+        return pd.read_sql(text(sql), engine)
+    sql = f"SELECT {columns} FROM tally_data WHERE row_version > :since"
+    return pd.read_sql(text(sql), engine, params={'since': int(since_version)})
+
 def get_filters():
     """Get filter options"""
     try:
@@ -99,6 +315,7 @@ def get_filters():
         print(f"Error getting filters: {e}")
         return {} 
 
+@metrics.instrumented('get_unmatched_data')
 def get_unmatched_data():
     """Get all unmatched transactions"""
     try:
@@ -125,79 +342,238 @@ def get_unmatched_data():
             for key, value in record.items():
                 if pd.isna(value):
                     record[key] = None
-            
+        
+        metrics.count_rows('get_unmatched_data', len(records))
         return records
     except Exception as e:
         print(f"Error getting unmatched data: {e}")
         return []
 
-def find_matches(data):
-    """Find matching transactions based on amount and keywords"""
+# Ledger columns written to report exports; match state is empty for unmatched rows
+UNMATCHED_EXPORT_COLUMNS = ('tally_uid', 'lender', 'borrower', 'statement_month', 'statement_year', 'Date',
+                            'dr_cr', 'Particulars', 'Vch_Type', 'Vch_No', 'Debit', 'Credit', 'entered_by')
+
+def iter_unmatched_rows(chunk_size=None):
+    """Unmatched rows for export as lists of tuples, chunk_size rows at a time
+
+    Newest date first like get_unmatched_data, but projected to
+    UNMATCHED_EXPORT_COLUMNS and read through a server-side cursor, so a
+    report of any size is written without holding the ledger in memory.
+    """
+    ensure_table_exists('tally_data')
+    chunk_size = chunk_size or config.MATCH_STREAM_CHUNK_ROWS
+    sql = f"""
+        SELECT {', '.join(UNMATCHED_EXPORT_COLUMNS)}
+        FROM tally_data
+        WHERE match_status = 'unmatched' OR match_status IS NULL
+        ORDER BY Date DESC, id
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(text(sql))
+        for chunk in result.partitions():
+            yield [tuple(row) for row in chunk]
+
+def _is_ledger_of(record, lender, borrower):
+    """Check if a record belongs to the lender's ledger for the borrower"""
+    if record.get('lender') != lender:
+        return False
+    # Older uploads may lack a borrower; accept them for any counterparty
+    return not record.get('borrower') or record.get('borrower') == borrower
+
+@metrics.instrumented('find_matches')
+def find_matches(data, lender='Steel', borrower='GeoTex'):
+    """Find matching transactions based on amount and keywords
+
+    Credits in the lender's ledger are matched against debits in the
+    borrower's ledger.
+    """
     if not data:
         print("No data to match")
         return []
         
     matches = []
     
-    # Separate Steel credits and GeoTex debits
-    steel_credits = []
-    geotex_debits = []
+    # Separate lender credits and borrower debits
+    lender_credits = []
+    borrower_debits = []
     
     for r in data:
-        if r.get('lender') == 'Steel':
+        if _is_ledger_of(r, lender, borrower):
             credit = r.get('Credit')
             debit = r.get('Debit')
             # Check if Credit has a value and Debit is None/NaN
             if credit and credit > 0 and (debit is None or pd.isna(debit) or debit == 0):
-                steel_credits.append(r)
-        elif r.get('lender') == 'GeoTex':
+                lender_credits.append(r)
+        elif _is_ledger_of(r, borrower, lender):
             debit = r.get('Debit')
             credit = r.get('Credit')
             # Check if Debit has a value and Credit is None/NaN
             if debit and debit > 0 and (credit is None or pd.isna(credit) or credit == 0):
-                geotex_debits.append(r)
+                borrower_debits.append(r)
+    
+    print(f"Found {len(lender_credits)} {lender} credits and {len(borrower_debits)} {borrower} debits")
+    
+    # PO/L/C references with swapped characters, looked up through a swap-key index
+    fuzzy = reference_index.fuzzy_reference_pairs(
+        ((r.get('tally_uid'), float(r['Credit']), r.get('Particulars')) for r in lender_credits),
+        ((r.get('tally_uid'), float(r['Debit']), r.get('Particulars')) for r in borrower_debits),
+        config.FUZZY_REFERENCE_MAX_SWAPS
+    )
+    
+    # Bucket borrower debits by amount, keeping their order
+    debits_by_amount = {}
+    for borrower_record in borrower_debits:
+        debits_by_amount.setdefault(float(borrower_record['Debit']), []).append(borrower_record)  # No rounding
     
-    print(f"Found {len(steel_credits)} Steel credits and {len(geotex_debits)} GeoTex debits")
+    # Match lender credits with borrower debits of exactly the same amount
+    for lender_record in lender_credits:
+        lender_amount = float(lender_record['Credit'])  # No rounding
+        
+        for borrower_record in debits_by_amount.get(lender_amount, []):
+            match = score_pair(
+                lender_record.get('tally_uid'), lender_record.get('Particulars', ''),
+                borrower_record.get('tally_uid'), borrower_record.get('Particulars', ''),
+                lender_amount,
+                fuzzy.get((lender_record.get('tally_uid'), borrower_record.get('tally_uid')))
+            )
+            if match:
+                matches.append(match)
+    
+    print(f"Found {len(matches)} matches")
+    metrics.count_rows('find_matches', len(data))
+    return matches
+
+def get_unit_pairs():
+    """(lender, borrower) pairs with unmatched rows in both directions"""
+    ensure_table_exists('tally_data')
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+            SELECT DISTINCT lender, borrower FROM tally_data
+            WHERE (match_status = 'unmatched' OR match_status IS NULL)
+            AND lender IS NOT NULL AND borrower IS NOT NULL AND borrower != ''
+        """))
+        pairs = {(row.lender, row.borrower) for row in result}
+    return sorted(pair for pair in pairs if (pair[1], pair[0]) in pairs)
+
+def _stream_side(conn, lender, borrower, amount_column, other_column, chunk_size):
+    """Unmatched rows of one ledger side, ordered by amount, fetched chunk_size at a time
+
+    Only the columns the matcher needs are selected, and with
+    stream_results the driver uses a server-side cursor (PyMySQL's
+    SSCursor), so rows arrive as they are consumed.
+    """
+    sql = f"""
+        SELECT tally_uid, Particulars, {amount_column} as amount
+        FROM tally_data
+        WHERE (match_status = 'unmatched' OR match_status IS NULL)
+        AND lender = :lender
+        AND (borrower = :borrower OR borrower IS NULL OR borrower = '')
+        AND {amount_column} > 0
+        AND ({other_column} IS NULL OR {other_column} = 0)
+        ORDER BY {amount_column}, Date DESC, id
+    """
+    result = conn.execution_options(yield_per=chunk_size).execute(
+        text(sql), {'lender': lender, 'borrower': borrower}
+    )
+    for row in result:
+        yield row
+
+def _amount_buckets(rows):
+    """Group an amount-ordered row stream into (amount, rows) buckets"""
+    for amount, bucket in groupby(rows, key=lambda row: float(row.amount)):
+        yield amount, list(bucket)
+
+@metrics.instrumented('find_matches_streaming')
+def find_matches_streaming(lender='Steel', borrower='GeoTex', chunk_size=None):
+    """Same matches as find_matches, computed as a merge over two amount-ordered streams
+
+    Lender credits and borrower debits are read through separate
+    server-side cursors, both sorted by amount. Only the current amount
+    bucket of each side is held in memory, so peak memory follows the
+    largest bucket rather than the number of unmatched rows.
+    """
+    ensure_table_exists('tally_data')
+    chunk_size = chunk_size or config.MATCH_STREAM_CHUNK_ROWS
+    matches = []
+    rows_read = 0
     
-    # Match Steel credits with GeoTex debits
-    for steel_record in steel_credits:
-        steel_amount = float(steel_record['Credit'])  # No rounding
+    # An unbuffered cursor holds its connection until drained, so each side gets its own
+    with engine.connect() as credit_conn, engine.connect() as debit_conn:
+        credits = _amount_buckets(_stream_side(credit_conn, lender, borrower, 'Credit', 'Debit', chunk_size))
+        debits = _amount_buckets(_stream_side(debit_conn, borrower, lender, 'Debit', 'Credit', chunk_size))
         
-        # Find matching amount in GeoTex debits
-        for geotex_record in geotex_debits:
-            geotex_amount = float(geotex_record['Debit'])  # No rounding
+        credit_bucket = next(credits, None)
+        debit_bucket = next(debits, None)
+        while credit_bucket is not None and debit_bucket is not None:
+            credit_amount, credit_rows = credit_bucket
+            debit_amount, debit_rows = debit_bucket
+            if credit_amount < debit_amount:
+                rows_read += len(credit_rows)
+                credit_bucket = next(credits, None)
+                continue
+            if debit_amount < credit_amount:
+                rows_read += len(debit_rows)
+                debit_bucket = next(debits, None)
+                continue
             
-            if steel_amount == geotex_amount:  # Exact match
-                # Calculate keyword similarity
-                similarity, keywords = calculate_keyword_similarity(
-                    steel_record.get('Particulars', ''),
-                    geotex_record.get('Particulars', '')
-                )
-                
-                # Check if this is a PO reference match (similarity = 1.0)
-                if similarity == 1.0:
-                    # PO reference exact match - confirmed match
-                    matches.append({
-                        'debit_id': geotex_record.get('tally_uid'),
-                        'credit_id': steel_record.get('tally_uid'),
-                        'similarity': similarity,
-                        'amount': str(steel_amount),
-                        'match_type': 'po_reference',
-                        'matching_keywords': keywords
-                    })
-                elif similarity > 0.1:  # Regular keyword match
-                    matches.append({
-                        'debit_id': geotex_record.get('tally_uid'),
-                        'credit_id': steel_record.get('tally_uid'),
-                        'similarity': similarity,
-                        'amount': str(steel_amount),
-                        'match_type': 'keyword',
-                        'matching_keywords': keywords
-                    })
+            fuzzy = reference_index.fuzzy_reference_pairs(
+                ((row.tally_uid, credit_amount, row.Particulars) for row in credit_rows),
+                ((row.tally_uid, debit_amount, row.Particulars) for row in debit_rows),
+                config.FUZZY_REFERENCE_MAX_SWAPS
+            )
+            for credit in credit_rows:
+                for debit in debit_rows:
+                    match = score_pair(
+                        credit.tally_uid, credit.Particulars,
+                        debit.tally_uid, debit.Particulars,
+                        credit_amount,
+                        fuzzy.get((credit.tally_uid, debit.tally_uid))
+                    )
+                    if match:
+                        matches.append(match)
+            
+            rows_read += len(credit_rows) + len(debit_rows)
+            credit_bucket = next(credits, None)
+            debit_bucket = next(debits, None)
     
     print(f"Found {len(matches)} matches")
+    metrics.count_rows('find_matches_streaming', rows_read)
     return matches
 
+def score_pair(credit_id, credit_particulars, debit_id, debit_particulars, amount, fuzzy=None):
+    """Score a same-amount credit/debit pair; returns a match dict or None
+
+    fuzzy is the (swaps, credit_reference, debit_reference) entry from
+    reference_index.fuzzy_reference_pairs when the pair's references only
+    differ by swapped characters.
+    """
+    # Calculate keyword similarity
+    similarity, keywords = calculate_keyword_similarity(credit_particulars, debit_particulars)
+    
+    # Check if this is a PO reference match (similarity = 1.0)
+    if similarity == 1.0:
+        # PO reference exact match - confirmed match
+        match_type = 'po_reference'
+    elif fuzzy is not None:
+        # References differ only by swapped characters
+        swaps, credit_reference, debit_reference = fuzzy
+        match_type = 'fuzzy_reference'
+        similarity = max(similarity, reference_index.fuzzy_score(swaps))
+        keywords = f"{credit_reference} ~ {debit_reference}"
+    elif similarity > 0.1:  # Regular keyword match
+        match_type = 'keyword'
+    else:
+        return None
+    
+    return {
+        'debit_id': debit_id,
+        'credit_id': credit_id,
+        'similarity': similarity,
+        'amount': str(amount),
+        'match_type': match_type,
+        'matching_keywords': keywords
+    }
+
 def calculate_keyword_similarity(text1, text2):
     """Calculate similarity between two text fields and return matching keywords"""
     if not text1 or not text2:
@@ -210,57 +586,18 @@ def calculate_keyword_similarity(text1, text2):
         return 1.0, "Particulars exact match"
     
     # 2. PO REFERENCE MATCH (Second Priority)
-    import re
-    po_pattern = r'.*/PO/[^/]*/[^/]*/[^/]*'
-    
-    po1_match = re.search(po_pattern, str(text1))
-    po2_match = re.search(po_pattern, str(text2))
+    core_po1 = reference_index.po_reference(text1)
+    core_po2 = reference_index.po_reference(text2)
     
-    if po1_match and po2_match:
-        po1_ref = po1_match.group(0)
-        po2_ref = po2_match.group(0)
-        
-        # Extract the core PO reference (ending with a number, before any dash or extra text)
-        def extract_core_po(po_text):
-            # Match pattern like FOB/PO/2023/8/5023 or similar, ending with digits
-            m = re.search(r'([A-Z]+/PO/\d+/\d+/\d+)', po_text)
-            if m:
-                return m.group(1)
-            # fallback: match up to last digit group
-            m = re.search(r'([A-Z]+/PO/[^/]+/[^/]+/\d+)', po_text)
-            if m:
-                return m.group(1)
-            return po_text
-        
-        core_po1 = extract_core_po(po1_ref)
-        core_po2 = extract_core_po(po2_ref)
-        
-        if core_po1 == core_po2:
-            return 1.0, core_po1
+    if core_po1 and core_po2 and core_po1 == core_po2:
+        return 1.0, core_po1
     
     # 3. L/C REFERENCE MATCH (Third Priority)
-    lc_pattern = r'L/C-([^/\s]+(?:\/[^/\s]+)*)'
-    lc1_match = re.search(lc_pattern, str(text1))
-    lc2_match = re.search(lc_pattern, str(text2))
-    
-    if lc1_match and lc2_match:
-        # Extract the core L/C reference (ending with a number, before any dash or extra text)
-        def extract_core_lc(lc_text):
-            # Match pattern like L/C-187724010124/24, ending with digits
-            m = re.search(r'(L/C-\d+(?:/\d+)+)', lc_text)
-            if m:
-                return m.group(1)
-            # fallback: match up to last digit group
-            m = re.search(r'(L/C-[^/]+(?:/[^/]+)*?/\d+)', lc_text)
-            if m:
-                return m.group(1)
-            return lc_text
-        
-        lc1_ref = extract_core_lc(lc1_match.group(0))
-        lc2_ref = extract_core_lc(lc2_match.group(0))
-        
-        if lc1_ref == lc2_ref:
-            return 1.0, lc2_ref
+    lc1_ref = reference_index.lc_reference(text1)
+    lc2_ref = reference_index.lc_reference(text2)
+    
+    if lc1_ref and lc2_ref and lc1_ref == lc2_ref:
+        return 1.0, lc2_ref
     
     # 4. REGULAR KEYWORD MATCH (Lowest Priority)
     # Extract keywords (simple approach)
@@ -296,88 +633,179 @@ def calculate_keyword_similarity(text1, text2):
     # For regular keyword matches, return empty keywords (no enhanced logic)
     return similarity, ""
 
+def _one_to_one(matches):
+    """Keep the best-scoring match for each row so every row belongs to at most one pair"""
+    used = set()
+    kept = []
+    for match in sorted(matches, key=lambda m: m['similarity'], reverse=True):
+        if match['debit_id'] in used or match['credit_id'] in used:
+            continue
+        used.add(match['debit_id'])
+        used.add(match['credit_id'])
+        kept.append(match)
+    return kept
+
+@metrics.instrumented('update_matches')
 def update_matches(matches):
-    """Update database with matched records"""
-    engine = create_engine(
-        f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
-    )
+    """Update database with matched records
+
+    Candidates are reduced to one pair per row first; returns the matches
+    that were stored.
+    """
+    if not matches:
+        return []
+    
+    ensure_table_exists('reconciliation_pairs')
+    ensure_table_exists('unmatched_summary')
+    matches = _one_to_one(matches)
+    
+    params = []
+    pairs = []
+    for match in matches:
+        # Credit record (lender) points to the borrower's debit
+        params.append({
+            'matched_with': match['debit_id'],
+            'match_score': match['similarity'],
+            'keywords': match.get('matching_keywords', ''),
+            'tally_uid': match['credit_id']
+        })
+        # Debit record (borrower) points to the lender's credit
+        params.append({
+            'matched_with': match['credit_id'],
+            'match_score': match['similarity'],
+            'keywords': match.get('matching_keywords', ''),
+            'tally_uid': match['debit_id']
+        })
+        pairs.append({
+            'debit_uid': match['debit_id'],
+            'credit_uid': match['credit_id'],
+            'match_score': match['similarity'],
+            'match_type': match.get('match_type'),
+            'keywords': match.get('matching_keywords', '')
+        })
     
     with engine.connect() as conn:
-        for match in matches:
-            # Update the credit record (Steel) - point to GeoTex
-            conn.execute(text("""
-                UPDATE tally_data 
-                SET matched_with = :matched_with, 
-                    match_status = 'matched', 
-                    match_score = :match_score, 
-                    reconciliation_date = NOW(),
-                    keywords = :keywords
-                WHERE tally_uid = :credit_id
-            """), {
-                'matched_with': match['debit_id'],  # Steel points to GeoTex
-                'match_score': match['similarity'],
-                'keywords': match.get('matching_keywords', ''),
-                'credit_id': match['credit_id']
-            })
-            
-            # Update the debit record (GeoTex) - point to Steel
-            conn.execute(text("""
-                UPDATE tally_data 
-                SET matched_with = :matched_with, 
-                    match_status = 'matched', 
-                    match_score = :match_score, 
-                    reconciliation_date = NOW(),
-                    keywords = :keywords
-                WHERE tally_uid = :debit_id
-            """), {
-                'matched_with': match['credit_id'],  # GeoTex points to Steel
-                'match_score': match['similarity'],
-                'keywords': match.get('matching_keywords', ''),
-                'debit_id': match['debit_id']
-            })
+        row_version = _bump_version(conn)
+        for row in params:
+            row['row_version'] = row_version
+        
+        # Single executemany for all rows instead of two round trips per match
+        conn.execute(text(f"""
+            UPDATE tally_data 
+            SET matched_with = :matched_with, 
+                match_status = 'matched', 
+                match_score = :match_score, 
+                reconciliation_date = {backend.now_sql},
+                keywords = :keywords,
+                row_version = :row_version
+            WHERE tally_uid = :tally_uid
+        """), params)
         
+        # One row per pair for the match views
+        conn.execute(text(f"""
+            INSERT INTO reconciliation_pairs
+                (debit_uid, credit_uid, match_score, match_type, keywords, status, created_at)
+            VALUES (:debit_uid, :credit_uid, :match_score, :match_type, :keywords, 'matched', {backend.now_sql})
+        """), pairs)
+        
+        _refresh_summary(conn, _summary_groups_of(conn, [row['tally_uid'] for row in params]))
         conn.commit()
+    metrics.count_rows('update_matches', len(params))
+    return matches
 
-def get_matched_data():
-    """Get matched transactions for display"""
-    engine = create_engine(
-        f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
-    )
+# Credit side of a pair is the primary row; the debit side is returned as matched_*
+# so callers see the same shape as the old matched_with self join, once per pair
+PAIR_SELECT = """
+    SELECT 
+        c.*,
+        p.pair_id,
+        p.match_type,
+        p.status as pair_status,
+        p.reviewed_by,
+        p.reviewed_at,
+        d.lender as matched_lender, 
+        d.borrower as matched_borrower,
+        d.Particulars as matched_particulars, 
+        d.Date as matched_date,
+        d.Debit as matched_Debit, 
+        d.Credit as matched_Credit,
+        d.keywords as matched_keywords,
+        d.tally_uid as matched_tally_uid
+    FROM {pairs} p
+    JOIN {rows} c ON c.tally_uid = p.credit_uid
+    JOIN {rows} d ON d.tally_uid = p.debit_uid
+"""
+
+def _pair_records(conn, where, params=None, limit=None, offset=0, archived=False):
+    if archived:
+        sql = PAIR_SELECT.format(pairs='reconciliation_pairs_archive', rows='tally_data_archive')
+    else:
+        sql = PAIR_SELECT.format(pairs='reconciliation_pairs', rows='tally_data')
+    sql += f" WHERE {where} ORDER BY p.created_at DESC, p.pair_id DESC"
+    params = dict(params or {})
+    if limit is not None:
+        sql += " LIMIT :limit OFFSET :offset"
+        params.update(limit=int(limit), offset=int(offset or 0))
     
+    records = []
+    for row in conn.execute(text(sql), params):
+        record = dict(row._mapping)
+        # Handle NaN values
+        for key, value in record.items():
+            if pd.isna(value):
+                record[key] = None
+        records.append(record)
+    return records
+
+def get_matched_data(limit=None, offset=0):
+    """Get matched transactions for display, optionally one page of them"""
+    ensure_table_exists('reconciliation_pairs')
     with engine.connect() as conn:
+        return _pair_records(conn, "p.status IN ('matched', 'confirmed')", limit=limit, offset=offset)
+
+def count_matched_data():
+    """Number of matched or confirmed pairs"""
+    ensure_table_exists('reconciliation_pairs')
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT COUNT(*) FROM reconciliation_pairs WHERE status IN ('matched', 'confirmed')"
+        )).scalar()
+
+def migrate_matched_with_to_pairs():
+    """Create reconciliation_pairs rows for matches recorded only in the matched_with columns
+
+    Safe to run repeatedly: rows that already belong to an open pair are skipped.
+    """
+    ensure_table_exists('reconciliation_pairs')
+    with engine.begin() as conn:
         result = conn.execute(text("""
-            SELECT 
-                t1.*,
-                t2.lender as matched_lender, 
-                t2.borrower as matched_borrower,
-                t2.Particulars as matched_particulars, 
-                t2.Date as matched_date,
-                t2.Debit as matched_Debit, 
-                t2.Credit as matched_Credit,
-                t2.keywords as matched_keywords,
-                t2.tally_uid as matched_tally_uid
-            FROM tally_data t1
-            LEFT JOIN tally_data t2 ON t1.matched_with = t2.tally_uid
-            WHERE (t1.match_status = 'matched' OR t1.match_status = 'confirmed')
-            AND t1.matched_with IS NOT NULL
-            ORDER BY t1.reconciliation_date DESC
+            INSERT INTO reconciliation_pairs
+                (debit_uid, credit_uid, match_score, match_type, keywords,
+                 status, reviewed_by, created_at, reviewed_at)
+            SELECT t.matched_with, t.tally_uid, t.match_score,
+                   CASE WHEN t.match_score >= 1 THEN 'po_reference' ELSE 'keyword' END,
+                   t.keywords, t.match_status, t.confirmed_by, t.reconciliation_date,
+                   CASE WHEN t.match_status = 'confirmed' THEN t.reconciliation_date END
+            FROM tally_data t
+            WHERE t.match_status IN ('matched', 'confirmed')
+            AND t.matched_with IS NOT NULL
+            AND t.Credit > 0
+            AND NOT EXISTS (
+                SELECT 1 FROM reconciliation_pairs p
+                WHERE p.credit_uid = t.tally_uid AND p.status IN ('matched', 'confirmed')
+            )
         """))
-        
-        records = []
-        for row in result:
-            record = dict(row._mapping)
-            # Handle NaN values
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
-            records.append(record)
-        
-        return records
+        return result.rowcount
 
 def update_match_status(tally_uid, status, confirmed_by=None):
     """Update match status (accepted/rejected)"""
     try:
+        ensure_table_exists('reconciliation_pairs')
+        ensure_table_exists('unmatched_summary')
         with engine.connect() as conn:
+            row_version = _bump_version(conn)
+            matched_with_uid = None
+            
             if status == 'rejected':
                 # First, get the matched_with value
                 sql_get_matched = """
@@ -395,10 +823,11 @@ def update_match_status(tally_uid, status, confirmed_by=None):
                     SET match_status = 'unmatched', 
                         matched_with = NULL,
                         match_score = NULL,
-                        reconciliation_date = NULL
+                        reconciliation_date = NULL,
+                        row_version = :row_version
                     WHERE tally_uid = :tally_uid
                     """
-                    conn.execute(text(sql_reset_main), {'tally_uid': tally_uid})
+                    conn.execute(text(sql_reset_main), {'tally_uid': tally_uid, 'row_version': row_version})
                     
                     # Reset the matched record
                     sql_reset_matched = """
@@ -406,10 +835,11 @@ def update_match_status(tally_uid, status, confirmed_by=None):
                     SET match_status = 'unmatched', 
                         matched_with = NULL,
                         match_score = NULL,
-                        reconciliation_date = NULL
+                        reconciliation_date = NULL,
+                        row_version = :row_version
                     WHERE tally_uid = :matched_with_uid
                     """
-                    conn.execute(text(sql_reset_matched), {'matched_with_uid': matched_with_uid})
+                    conn.execute(text(sql_reset_matched), {'matched_with_uid': matched_with_uid, 'row_version': row_version})
                     
                 else:
                     # Just reset the main record if no match found
@@ -418,10 +848,11 @@ def update_match_status(tally_uid, status, confirmed_by=None):
                     SET match_status = 'unmatched', 
                         matched_with = NULL,
                         match_score = NULL,
-                        reconciliation_date = NULL
+                        reconciliation_date = NULL,
+                        row_version = :row_version
                     WHERE tally_uid = :tally_uid
                     """
-                    conn.execute(text(sql_reset_main), {'tally_uid': tally_uid})
+                    conn.execute(text(sql_reset_main), {'tally_uid': tally_uid, 'row_version': row_version})
                 
             else:
                 # For confirmed status, first get the matched_with value
@@ -435,47 +866,72 @@ def update_match_status(tally_uid, status, confirmed_by=None):
                     matched_with_uid = matched_record[0]
                     
                     # Update the main record
-                    sql_update_main = """
+                    sql_update_main = f"""
                     UPDATE tally_data 
                     SET match_status = :status, 
-                        reconciliation_date = NOW(),
-                        confirmed_by = :confirmed_by
+                        reconciliation_date = {backend.now_sql},
+                        confirmed_by = :confirmed_by,
+                        row_version = :row_version
                     WHERE tally_uid = :tally_uid
                     """
                     conn.execute(text(sql_update_main), {
                         'status': status,
                         'confirmed_by': confirmed_by,
+                        'row_version': row_version,
                         'tally_uid': tally_uid
                     })
                     
                     # Update the matched record
-                    sql_update_matched = """
+                    sql_update_matched = f"""
                     UPDATE tally_data 
                     SET match_status = :status, 
-                        reconciliation_date = NOW(),
-                        confirmed_by = :confirmed_by
+                        reconciliation_date = {backend.now_sql},
+                        confirmed_by = :confirmed_by,
+                        row_version = :row_version
                     WHERE tally_uid = :matched_with_uid
                     """
                     conn.execute(text(sql_update_matched), {
                         'status': status,
                         'confirmed_by': confirmed_by,
+                        'row_version': row_version,
                         'matched_with_uid': matched_with_uid
                     })
                 else:
                     # Just update the main record if no match found
-                    sql_update_main = """
+                    sql_update_main = f"""
                     UPDATE tally_data 
                     SET match_status = :status, 
-                        reconciliation_date = NOW(),
-                        confirmed_by = :confirmed_by
+                        reconciliation_date = {backend.now_sql},
+                        confirmed_by = :confirmed_by,
+                        row_version = :row_version
                     WHERE tally_uid = :tally_uid
                     """
                     conn.execute(text(sql_update_main), {
                         'status': status,
                         'confirmed_by': confirmed_by,
+                        'row_version': row_version,
                         'tally_uid': tally_uid
                     })
             
+            # Record the review on the open pair containing this row
+            sql_update_pair = f"""
+            UPDATE reconciliation_pairs 
+            SET status = :status, 
+                reviewed_by = :confirmed_by,
+                reviewed_at = {backend.now_sql}
+            WHERE (credit_uid = :tally_uid OR debit_uid = :tally_uid)
+            AND status IN ('matched', 'confirmed')
+            """
+            conn.execute(text(sql_update_pair), {
+                'status': status,
+                'confirmed_by': confirmed_by,
+                'tally_uid': tally_uid
+            })
+            
+            # A rejected pair is outstanding again
+            if status == 'rejected':
+                _refresh_summary(conn, _summary_groups_of(conn, [uid for uid in (tally_uid, matched_with_uid) if uid]))
+            
             conn.commit()
             return True
             
@@ -486,30 +942,9 @@ def update_match_status(tally_uid, status, confirmed_by=None):
 def get_pending_matches():
     """Get matches that need user confirmation"""
     try:
-        ensure_table_exists('tally_data')
-        
-        sql = """
-        SELECT t1.*, t2.lender as matched_lender, t2.borrower as matched_borrower,
-               t2.Particulars as matched_particulars, t2.Date as matched_date,
-               t2.Debit as matched_Debit, t2.Credit as matched_Credit
-        FROM tally_data t1
-        LEFT JOIN tally_data t2 ON t1.matched_with = t2.tally_uid
-        WHERE t1.match_status = 'matched' AND t1.confirmed_by IS NULL
-        ORDER BY t1.reconciliation_date DESC
-        """
-        
-        df = pd.read_sql(sql, engine)
-        
-        # Convert to records and handle NaN values
-        records = df.to_dict('records')
-        
-        # Replace NaN values with None for JSON serialization
-        for record in records:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
-        
-        return records
+        ensure_table_exists('reconciliation_pairs')
+        with engine.connect() as conn:
+            return _pair_records(conn, "p.status = 'matched'")
     except Exception as e:
         print(f"Error getting pending matches: {e}")
         return []
@@ -517,38 +952,113 @@ def get_pending_matches():
 def get_confirmed_matches():
     """Get confirmed matches"""
     try:
-        ensure_table_exists('tally_data')
-        
-        sql = """
-        SELECT t1.*, t2.lender as matched_lender, t2.borrower as matched_borrower,
-               t2.Particulars as matched_particulars, t2.Date as matched_date,
-               t2.Debit as matched_Debit, t2.Credit as matched_Credit
-        FROM tally_data t1
-        LEFT JOIN tally_data t2 ON t1.matched_with = t2.tally_uid
-        WHERE t1.match_status = 'confirmed' AND t1.confirmed_by IS NOT NULL
-        ORDER BY t1.reconciliation_date DESC
-        """
-        
-        df = pd.read_sql(sql, engine)
-        
-        # Convert to records and handle NaN values
-        records = df.to_dict('records')
-        
-        # Replace NaN values with None for JSON serialization
-        for record in records:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
-        
-        return records
+        ensure_table_exists('reconciliation_pairs')
+        with engine.connect() as conn:
+            return _pair_records(conn, "p.status = 'confirmed'")
     except Exception as e:
         print(f"Error getting confirmed matches: {e}")
         return [] 
 
+def _statement_period(year, month):
+    """(year, month number) of a statement period, or None when it cannot be read"""
+    try:
+        year = int(str(year).strip())
+    except (TypeError, ValueError):
+        return None
+    month = str(month or '').strip().lower()
+    for number in range(1, 13):
+        if month in (calendar.month_name[number].lower(), calendar.month_abbr[number].lower()):
+            return year, number
+    if month.isdigit() and 1 <= int(month) <= 12:
+        return year, int(month)
+    return None
+
+def _move_rows(conn, source, target, key, values, extra_columns=None):
+    """Copy rows whose key is in values from source to target, then delete them from source"""
+    columns = ', '.join(backend.get_columns(source))
+    extra_columns = extra_columns or {}
+    target_columns = ', '.join([columns] + list(extra_columns))
+    select_columns = ', '.join([columns] + list(extra_columns.values()))
+    conn.execute(text(f"""
+        INSERT INTO {target} ({target_columns})
+        SELECT {select_columns} FROM {source} WHERE {key} IN :values
+    """).bindparams(bindparam('values', expanding=True)), {'values': values})
+    conn.execute(text(f"DELETE FROM {source} WHERE {key} IN :values")
+                 .bindparams(bindparam('values', expanding=True)), {'values': values})
+
+def _record_removed(conn, uids, row_version):
+    """Leave tombstones for rows deleted from tally_data, for the delta feed"""
+    conn.execute(text("DELETE FROM tally_data_removed WHERE tally_uid IN :uids")
+                 .bindparams(bindparam('uids', expanding=True)), {'uids': list(uids)})
+    conn.execute(text(f"""
+        INSERT INTO tally_data_removed (tally_uid, row_version, removed_at)
+        VALUES (:tally_uid, :row_version, {backend.now_sql})
+    """), [{'tally_uid': uid, 'row_version': row_version} for uid in uids])
+
+@metrics.instrumented('archive_closed_periods')
+def archive_closed_periods(before, batch_size=500):
+    """Move confirmed pairs of closed statement periods to the archive tables
+
+    A pair is archived when the statement periods of both its rows are
+    earlier than `before`, a (year, month) tuple. Both rows move to
+    tally_data_archive and the pair to reconciliation_pairs_archive, so
+    tally_data only grows with open items. Returns the number of pairs moved.
+    """
+    ensure_table_exists('tally_data_archive')
+    ensure_table_exists('reconciliation_pairs_archive')
+    ensure_table_exists('tally_data_removed')
+    
+    with engine.connect() as conn:
+        candidates = conn.execute(text("""
+            SELECT p.pair_id, p.credit_uid, p.debit_uid,
+                   c.statement_year as credit_year, c.statement_month as credit_month,
+                   d.statement_year as debit_year, d.statement_month as debit_month
+            FROM reconciliation_pairs p
+            JOIN tally_data c ON c.tally_uid = p.credit_uid
+            JOIN tally_data d ON d.tally_uid = p.debit_uid
+            WHERE p.status = 'confirmed'
+        """)).fetchall()
+    
+    closed = []
+    for row in candidates:
+        periods = (_statement_period(row.credit_year, row.credit_month),
+                   _statement_period(row.debit_year, row.debit_month))
+        if all(period is not None and period < tuple(before) for period in periods):
+            closed.append(row)
+    
+    # Batches keep each transaction, and its IN lists, bounded
+    for start in range(0, len(closed), batch_size):
+        batch = closed[start:start + batch_size]
+        uids = [row.credit_uid for row in batch] + [row.debit_uid for row in batch]
+        with engine.begin() as conn:
+            row_version = _bump_version(conn)
+            _move_rows(conn, 'tally_data', 'tally_data_archive', 'tally_uid', uids,
+                       {'archived_at': backend.now_sql})
+            _record_removed(conn, uids, row_version)
+            _move_rows(conn, 'reconciliation_pairs', 'reconciliation_pairs_archive', 'pair_id',
+                       [row.pair_id for row in batch])
+    
+    metrics.count_rows('archive_closed_periods', 2 * len(closed))
+    return len(closed)
+
+def get_archived_matches(limit=None, offset=0):
+    """Get archived confirmed matches, optionally one page of them"""
+    try:
+        ensure_table_exists('reconciliation_pairs_archive')
+        with engine.connect() as conn:
+            return _pair_records(conn, "p.status = 'confirmed'", limit=limit, offset=offset, archived=True)
+    except Exception as e:
+        print(f"Error getting archived matches: {e}")
+        return []
+
 def reset_match_status():
     """Reset all match status columns to clear previous matches"""
     try:
+        ensure_table_exists('reconciliation_pairs')
+        ensure_table_exists('unmatched_summary')
         with engine.connect() as conn:
+            row_version = _bump_version(conn)
+            
             # Reset all match-related columns
             reset_query = text("""
                 UPDATE tally_data 
@@ -556,9 +1066,12 @@ def reset_match_status():
                     matched_with = NULL, 
                     match_score = NULL, 
                     keywords = NULL,
-                    confirmed_by = NULL
+                    confirmed_by = NULL,
+                    row_version = :row_version
             """)
-            conn.execute(reset_query)
+            conn.execute(reset_query, {'row_version': row_version})
+            conn.execute(text("DELETE FROM reconciliation_pairs"))
+            _rebuild_summary(conn)
             conn.commit()
             return True
     except Exception as e:
@@ -569,10 +1082,7 @@ def get_column_order():
     """Get the exact column order from the database"""
     try:
         ensure_table_exists('tally_data')
-        with engine.connect() as conn:
-            result = conn.execute(text("SHOW COLUMNS FROM tally_data"))
-            columns = [row[0] for row in result]
-        return columns
+        return backend.get_columns('tally_data')
     except Exception as e:
         print(f"Error getting column order: {e}")
         return [] 
\ No newline at end of file
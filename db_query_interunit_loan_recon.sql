@@ -25,6 +25,171 @@ CREATE TABLE IF NOT EXISTS tally_data (
     match_score DECIMAL(5,2),
     reconciliation_date DATETIME,
     confirmed_by VARCHAR(100),
-    keywords TEXT
+    keywords TEXT,
+    row_version BIGINT NOT NULL DEFAULT 0
 );
 
+
+
+-- MySQL has no CREATE INDEX IF NOT EXISTS or ADD COLUMN IF NOT EXISTS, so
+-- changes to tables that may already exist run through a prepared
+-- statement only when information_schema shows them missing. The whole
+-- script can be re-run to bring an existing database up to date.
+
+-- Databases created before row_version
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.columns
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND column_name = 'row_version') = 0,
+    'ALTER TABLE tally_data ADD COLUMN row_version BIGINT NOT NULL DEFAULT 0', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- Indexes used by the unmatched scan, match-view self joins and date ordering
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.statistics
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND index_name = 'idx_tally_data_match_status') = 0,
+    'CREATE INDEX idx_tally_data_match_status ON tally_data (match_status, lender)', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.statistics
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND index_name = 'idx_tally_data_matched_with') = 0,
+    'CREATE INDEX idx_tally_data_matched_with ON tally_data (matched_with)', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.statistics
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND index_name = 'idx_tally_data_date') = 0,
+    'CREATE INDEX idx_tally_data_date ON tally_data (Date)', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.statistics
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND index_name = 'idx_tally_data_row_version') = 0,
+    'CREATE INDEX idx_tally_data_row_version ON tally_data (row_version)', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- Change-version counter used for ETags and the /api/data/changes delta feed
+CREATE TABLE IF NOT EXISTS data_version (
+    id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+-- One row per matched pair; the match views read from here instead of
+-- self-joining tally_data on matched_with. Rejected pairs are kept for audit.
+CREATE TABLE IF NOT EXISTS reconciliation_pairs (
+    pair_id INT AUTO_INCREMENT PRIMARY KEY,
+    debit_uid VARCHAR(50) NOT NULL,
+    credit_uid VARCHAR(50) NOT NULL,
+    match_score DECIMAL(5,2),
+    match_type VARCHAR(20),
+    keywords TEXT,
+    status ENUM('matched', 'confirmed', 'rejected') NOT NULL DEFAULT 'matched',
+    reviewed_by VARCHAR(100),
+    created_at DATETIME,
+    reviewed_at DATETIME,
+    INDEX idx_pairs_status (status, created_at),
+    INDEX idx_pairs_debit_uid (debit_uid),
+    INDEX idx_pairs_credit_uid (credit_uid)
+);
+
+-- Existing databases with matches recorded only in matched_with can be
+-- migrated with `python batch_recon.py --migrate-pairs`, or directly:
+-- INSERT INTO reconciliation_pairs (debit_uid, credit_uid, match_score, match_type, keywords,
+--                                   status, reviewed_by, created_at, reviewed_at)
+-- SELECT t.matched_with, t.tally_uid, t.match_score,
+--        CASE WHEN t.match_score >= 1 THEN 'po_reference' ELSE 'keyword' END,
+--        t.keywords, t.match_status, t.confirmed_by, t.reconciliation_date,
+--        CASE WHEN t.match_status = 'confirmed' THEN t.reconciliation_date END
+-- FROM tally_data t
+-- WHERE t.match_status IN ('matched', 'confirmed') AND t.matched_with IS NOT NULL AND t.Credit > 0;
+
+-- Hot/cold split by statement period. tally_data holds open items and
+-- recent history; confirmed pairs of closed periods are moved to the
+-- archive tables by `python batch_recon.py --archive-before YYYY-MM`.
+-- (Native PARTITION BY is not used: MySQL requires the partitioning
+-- columns in every unique key, which tally_uid UNIQUE rules out.)
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.statistics
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND index_name = 'idx_tally_data_period') = 0,
+    'CREATE INDEX idx_tally_data_period ON tally_data (statement_year, statement_month)', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+CREATE TABLE IF NOT EXISTS tally_data_archive (
+    id INT PRIMARY KEY,
+    tally_uid VARCHAR(50) UNIQUE,
+    
+    Date DATE,
+    dr_cr VARCHAR(255),
+    Particulars TEXT,
+    Vch_Type VARCHAR(255),
+    Vch_No VARCHAR(255),
+    Debit DECIMAL(15,2),
+    Credit DECIMAL(15,2),
+    entered_by VARCHAR(100),
+    
+    lender VARCHAR(50),
+    borrower VARCHAR(50),
+    
+    statement_month VARCHAR(10),
+    statement_year VARCHAR(10),
+    
+    matched_with VARCHAR(50),
+    match_status ENUM('unmatched', 'matched', 'confirmed'),
+    match_score DECIMAL(5,2),
+    reconciliation_date DATETIME,
+    confirmed_by VARCHAR(100),
+    keywords TEXT,
+    row_version BIGINT NOT NULL DEFAULT 0,
+    archived_at DATETIME,
+    INDEX idx_archive_period (statement_year, statement_month),
+    INDEX idx_archive_matched_with (matched_with)
+);
+
+CREATE TABLE IF NOT EXISTS reconciliation_pairs_archive (
+    pair_id INT PRIMARY KEY,
+    debit_uid VARCHAR(50) NOT NULL,
+    credit_uid VARCHAR(50) NOT NULL,
+    match_score DECIMAL(5,2),
+    match_type VARCHAR(20),
+    keywords TEXT,
+    status ENUM('matched', 'confirmed', 'rejected') NOT NULL,
+    reviewed_by VARCHAR(100),
+    created_at DATETIME,
+    reviewed_at DATETIME,
+    INDEX idx_pairs_archive_reviewed (reviewed_at)
+);
+
+-- Rows removed from tally_data (archived), so /api/data/changes can
+-- report them to delta clients
+CREATE TABLE IF NOT EXISTS tally_data_removed (
+    tally_uid VARCHAR(50) PRIMARY KEY,
+    row_version BIGINT NOT NULL,
+    removed_at DATETIME,
+    INDEX idx_tally_data_removed_version (row_version)
+);
+
+-- Hot and cold rows together, for history queries
+CREATE OR REPLACE VIEW tally_data_all AS
+    SELECT t.*, NULL AS archived_at FROM tally_data t
+    UNION ALL
+    SELECT * FROM tally_data_archive;
+
+-- Outstanding unmatched amounts per unit pair and statement period, kept
+-- current at ingest and on every match-state change. Served by /api/summary.
+CREATE TABLE IF NOT EXISTS unmatched_summary (
+    lender VARCHAR(50) NOT NULL,
+    borrower VARCHAR(50) NOT NULL,
+    statement_year VARCHAR(10) NOT NULL,
+    statement_month VARCHAR(10) NOT NULL,
+    unmatched_debit DECIMAL(18,2) NOT NULL DEFAULT 0,
+    unmatched_credit DECIMAL(18,2) NOT NULL DEFAULT 0,
+    unmatched_rows INT NOT NULL DEFAULT 0,
+    updated_at DATETIME,
+    PRIMARY KEY (lender, borrower, statement_year, statement_month)
+);
+SET @ddl = IF((SELECT COUNT(*) FROM information_schema.statistics
+                  WHERE table_schema = DATABASE() AND table_name = 'tally_data'
+                  AND index_name = 'idx_tally_data_summary_group') = 0,
+    'CREATE INDEX idx_tally_data_summary_group ON tally_data (lender, statement_year, statement_month)', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- Existing databases: fill the summary once with
+-- `python batch_recon.py --rebuild-summary`
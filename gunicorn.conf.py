@@ -0,0 +1,68 @@
+# Production server settings, used as: gunicorn -c gunicorn.conf.py wsgi:app
+# Every setting can be overridden through the environment.
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('RECON_BIND', '0.0.0.0:5000')
+
+# A few prefork workers with a larger thread pool each: a long reconcile
+# or upload occupies one thread while the others keep serving reads.
+# Every worker holds its own ledger cache, so memory grows with the
+# worker count; most requests wait on the database, so threads are the
+# cheaper way to add concurrency.
+workers = int(os.environ.get('RECON_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('RECON_THREADS', 8))
+
+# Import the app once in the master; workers fork from it
+preload_app = True
+
+# Threaded workers heartbeat independently of requests, so this only
+# reaps hung workers; multi-minute reconciles are not cut off
+timeout = int(os.environ.get('RECON_TIMEOUT', 300))
+# On reload/shutdown, in-flight reconciles get this long to finish
+graceful_timeout = int(os.environ.get('RECON_GRACEFUL_TIMEOUT', 300))
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth from large uploads
+max_requests = int(os.environ.get('RECON_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+accesslog = '-'
+
+# Workers share their metrics through this directory, so /metrics reports
+# totals for the whole server whichever worker answers the scrape
+metrics_dir = os.environ.get('RECON_METRICS_DIR',
+                             os.path.join(tempfile.gettempdir(), f'recon_metrics_{os.getpid()}'))
+metrics_flush_seconds = float(os.environ.get('RECON_METRICS_FLUSH_SECONDS', 2))
+
+
+def on_starting(server):
+    import metrics
+    metrics.clear_multiprocess_dir(metrics_dir)
+
+
+def on_exit(server):
+    if 'RECON_METRICS_DIR' not in os.environ:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared across
+    # processes; drop the inherited pool so each worker opens its own
+    import database
+    import metrics
+    database.engine.dispose(close=False)
+    metrics.enable_multiprocess(metrics_dir, metrics_flush_seconds)
+
+
+def worker_exit(server, worker):
+    # Final counts of a recycled or stopped worker
+    import metrics
+    metrics.write_snapshot()
+
+
+def child_exit(server, worker):
+    import metrics
+    metrics.mark_process_dead(worker.pid, metrics_dir)
@@ -0,0 +1,154 @@
+import threading
+import numpy as np
+import pandas as pd
+import config
+import database
+import metrics
+import reference_index
+
+# Date ordinal for rows without a date
+NO_DATE = np.iinfo(np.int64).min
+
+COLUMNS = ('id', 'uid', 'lender', 'borrower', 'date', 'credit', 'debit', 'particulars')
+
+
+class LedgerStore:
+    """Unmatched rows kept in process as compact columnar arrays
+
+    Amounts are int64 cents, dates are day ordinals and lender/borrower
+    names are interned to small integer codes (0 for a missing name).
+    The store follows the data change version: a refresh after an upload
+    or a match-state change only reads the rows that changed since the
+    last refresh, so reconcile runs start matching without a full reload.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.codes = {'': 0}
+        self.names = ['']
+        self.columns = self._from_frame(pd.DataFrame(columns=['id', 'tally_uid', 'lender', 'borrower',
+                                                              'Date', 'Debit', 'Credit', 'Particulars']))
+
+    def __len__(self):
+        return len(self.columns['uid'])
+
+    def _intern(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, name in enumerate(values):
+            name = name if isinstance(name, str) else ''
+            code = self.codes.get(name)
+            if code is None:
+                code = self.codes[name] = len(self.names)
+                self.names.append(name)
+            codes[i] = code
+        return codes
+
+    def _from_frame(self, df):
+        def cents(values):
+            amounts = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=float)
+            return np.round(amounts * 100).astype(np.int64)
+
+        dates = pd.to_datetime(df['Date'], errors='coerce')
+        ordinals = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+        ordinals[dates.isna().to_numpy()] = NO_DATE
+
+        return {
+            'id': df['id'].to_numpy(dtype=np.int64),
+            'uid': df['tally_uid'].to_numpy(dtype=object),
+            'lender': self._intern(df['lender'].tolist()),
+            'borrower': self._intern(df['borrower'].tolist()),
+            'date': ordinals,
+            'credit': cents(df['Credit']),
+            'debit': cents(df['Debit']),
+            'particulars': np.array([text if isinstance(text, str) else None for text in df['Particulars']], dtype=object),
+        }
+
+    @staticmethod
+    def _sorted(columns):
+        # Same order as get_unmatched_data: newest date first
+        order = np.lexsort((columns['id'], -columns['date'].astype(np.float64)))
+        return {name: values[order] for name, values in columns.items()}
+
+    @metrics.instrumented('ledger_refresh')
+    def refresh(self):
+        """Bring the store up to date with the database"""
+        with self.lock:
+            version = database.get_data_version()
+            if version is not None and version == self.version:
+                return
+
+            if self.version is None or version is None or version < self.version:
+                columns = self._from_frame(database.get_ledger_rows())
+            else:
+                changed = database.get_ledger_rows(since_version=self.version)
+                keep = ~np.isin(self.columns['uid'], changed['tally_uid'].to_numpy(dtype=object))
+                unmatched = changed[changed['match_status'].isna() | (changed['match_status'] == 'unmatched')]
+                added = self._from_frame(unmatched)
+                columns = {name: np.concatenate([self.columns[name][keep], added[name]]) for name in COLUMNS}
+                metrics.count_rows('ledger_refresh', len(changed))
+
+            self.columns = self._sorted(columns)
+            self.version = version
+
+    def unit_pairs(self):
+        """(lender, borrower) pairs for which both units' ledgers are cached"""
+        columns = self.columns
+        pairs = {(self.names[l], self.names[b]) for l, b in zip(columns['lender'], columns['borrower']) if l and b}
+        return sorted(pair for pair in pairs if (pair[1], pair[0]) in pairs)
+
+    @metrics.instrumented('find_matches_cached')
+    def find_matches(self, lender='Steel', borrower='GeoTex'):
+        """Same matches as database.find_matches, computed from the cached arrays"""
+        columns = self.columns
+        lender_code = self.codes.get(lender, -1)
+        borrower_code = self.codes.get(borrower, -1)
+
+        # Older uploads may lack a borrower (code 0); accept them for any counterparty
+        credit_rows = np.flatnonzero(
+            (columns['lender'] == lender_code)
+            & ((columns['borrower'] == borrower_code) | (columns['borrower'] == 0))
+            & (columns['credit'] > 0) & (columns['debit'] == 0)
+        )
+        debit_rows = np.flatnonzero(
+            (columns['lender'] == borrower_code)
+            & ((columns['borrower'] == lender_code) | (columns['borrower'] == 0))
+            & (columns['debit'] > 0) & (columns['credit'] == 0)
+        )
+        print(f"Found {len(credit_rows)} {lender} credits and {len(debit_rows)} {borrower} debits")
+
+        uids = columns['uid']
+        particulars = columns['particulars']
+        # PO/L/C references with swapped characters, looked up through a swap-key index
+        fuzzy = reference_index.fuzzy_reference_pairs(
+            ((row, cents, particulars[row]) for row, cents in zip(credit_rows.tolist(), columns['credit'][credit_rows].tolist())),
+            ((row, cents, particulars[row]) for row, cents in zip(debit_rows.tolist(), columns['debit'][debit_rows].tolist())),
+            config.FUZZY_REFERENCE_MAX_SWAPS
+        )
+
+        # Debit rows grouped by amount, keeping store order within a group
+        debit_cents = columns['debit'][debit_rows]
+        order = np.argsort(debit_cents, kind='stable')
+        amounts, starts = np.unique(debit_cents[order], return_index=True)
+        groups = np.split(debit_rows[order], starts[1:])
+        debits_by_amount = dict(zip(amounts.tolist(), groups))
+
+        matches = []
+        for credit_row, cents in zip(credit_rows, columns['credit'][credit_rows].tolist()):
+            for debit_row in debits_by_amount.get(cents, ()):
+                match = database.score_pair(
+                    uids[credit_row], particulars[credit_row],
+                    uids[debit_row], particulars[debit_row],
+                    cents / 100,
+                    fuzzy.get((int(credit_row), int(debit_row)))
+                )
+                if match:
+                    matches.append(match)
+
+        print(f"Found {len(matches)} matches")
+        metrics.count_rows('find_matches_cached', len(credit_rows) + len(debit_rows))
+        return matches
+
+
+# Process-wide store; every worker process keeps its own copy
+store = LedgerStore()
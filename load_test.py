@@ -0,0 +1,88 @@
+"""Concurrent load test for the read endpoints.
+
+Runs against a server started with either app.py or gunicorn and
+reports throughput and latency per endpoint:
+
+    python load_test.py --url http://localhost:5000 --concurrency 16 --requests 400
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+ENDPOINTS = (
+    '/api/data?offset=0&limit=200',
+    '/api/filters',
+    '/api/matches?offset=0&limit=200',
+    '/api/pending-matches',
+    '/api/confirmed-matches',
+)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_endpoint(base_url, path, concurrency, total, revalidate):
+    """Fire `total` GETs at one endpoint from `concurrency` threads"""
+    etags = {}
+
+    def fetch(_):
+        headers = {}
+        if revalidate and path in etags:
+            headers['If-None-Match'] = etags[path]
+        start = time.perf_counter()
+        response = requests.get(base_url + path, headers=headers, timeout=300)
+        elapsed = time.perf_counter() - start
+        if response.headers.get('ETag'):
+            etags[path] = response.headers['ETag']
+        return elapsed, response.status_code, len(response.content)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed for elapsed, _, _ in results]
+    errors = sum(1 for _, status, _ in results if status >= 400)
+    not_modified = sum(1 for _, status, _ in results if status == 304)
+    return {
+        'path': path,
+        'rps': total / wall,
+        'p50': percentile(latencies, 0.5) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'errors': errors,
+        'not_modified': not_modified,
+        'bytes': sum(size for _, _, size in results),
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Load test the read endpoints')
+    arg_parser.add_argument('--url', default='http://localhost:5000', help='Server base URL')
+    arg_parser.add_argument('--concurrency', '-c', type=int, default=8, help='Concurrent clients')
+    arg_parser.add_argument('--requests', '-n', type=int, default=200, help='Requests per endpoint')
+    arg_parser.add_argument('--revalidate', action='store_true',
+                            help='Send If-None-Match like a browser cache (measures the 304 path)')
+    args = arg_parser.parse_args(argv)
+
+    base_url = args.url.rstrip('/')
+    try:
+        requests.get(base_url + '/api/filters', timeout=10)
+    except requests.RequestException as e:
+        print(f"Server not reachable at {base_url}: {e}")
+        return 1
+
+    print(f"{'endpoint':<36} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'304s':>6} {'errors':>6} {'MB':>8}")
+    for path in ENDPOINTS:
+        result = run_endpoint(base_url, path, args.concurrency, args.requests, args.revalidate)
+        print(f"{result['path']:<36} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+              f"{result['not_modified']:>6} {result['errors']:>6} {result['bytes'] / 1e6:>8.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from sub-millisecond queries to multi-minute reconciles
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_metrics = {}
+
+# Directory shared by all server processes, set by enable_multiprocess()
+_multiprocess_dir = None
+
+# Snapshot of processes that have exited, kept by the master
+EXITED_SNAPSHOT = 'exited.json'
+# Held shared while reading snapshots and exclusively while folding one in
+LOCK_FILE = 'snapshots.lock'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    def merge(self, values):
+        for labels, value in values:
+            key = tuple(tuple(pair) for pair in labels)
+            self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        lines = []
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with labels"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def snapshot(self):
+        return [[list(labels), dict(entry, counts=list(entry['counts']))] for labels, entry in self.values.items()]
+
+    def merge(self, values):
+        for labels, entry in values:
+            key = tuple(tuple(pair) for pair in labels)
+            total = self.values.get(key)
+            if total is None:
+                total = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            total['counts'] = [a + b for a, b in zip(total['counts'], entry['counts'])]
+            total['sum'] += entry['sum']
+            total['count'] += entry['count']
+
+    def render(self):
+        lines = []
+        for labels, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry['counts']):
+                lines.append(f'{self.name}_bucket{_format_labels(labels + (("le", bound),))} {count}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {entry["count"]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {entry["sum"]}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {entry["count"]}')
+        return lines
+
+
+def _register(metric):
+    with _lock:
+        return _metrics.setdefault(metric.name, metric)
+
+
+def counter(name, help_text):
+    """Get or create a counter"""
+    return _register(Counter(name, help_text))
+
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    """Get or create a histogram"""
+    return _register(Histogram(name, help_text, buckets))
+
+
+stage_seconds = histogram('recon_stage_duration_seconds', 'Time spent in each processing stage')
+stage_rows = counter('recon_stage_rows_total', 'Rows handled by each processing stage')
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a block in the stage histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
+
+
+def instrumented(stage):
+    """Decorator form of timed()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_stages(timings, prefix):
+    """Record a dict of stage -> seconds, e.g. the phase timings from parse_tally_file"""
+    for stage, seconds in timings.items():
+        stage_seconds.observe(seconds, stage=f'{prefix}.{stage}')
+
+
+def count_rows(stage, rows):
+    stage_rows.inc(rows, stage=stage)
+
+
+def _render(metrics):
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.type_name}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def render():
+    """Render all metrics in the Prometheus text exposition format
+
+    In multiprocess mode the result covers every server process, so
+    scrapes that land on different workers see the same totals.
+    """
+    if _multiprocess_dir is None:
+        with _lock:
+            return _render(_metrics.values())
+    write_snapshot()
+    with _directory_lock(_multiprocess_dir):
+        merged = _merge_snapshots(glob.glob(os.path.join(_multiprocess_dir, '*.json')))
+    return _render(merged.values())
+
+
+# Multiprocess mode. Under a prefork server every worker has its own
+# registry, so each one writes a snapshot file to a shared directory
+# and /metrics sums all of them. Counters and histograms only grow, so
+# the snapshots of exited workers are folded into EXITED_SNAPSHOT and
+# totals do not drop when workers are recycled.
+
+def _snapshot(metrics):
+    return {
+        metric.name: {
+            'type': metric.type_name,
+            'help': metric.help_text,
+            'buckets': list(getattr(metric, 'buckets', ())),
+            'values': metric.snapshot(),
+        }
+        for metric in metrics
+    }
+
+
+@contextmanager
+def _directory_lock(directory, exclusive=False):
+    # Only multiprocess mode (gunicorn, Unix only) locks; single-process
+    # runs never import fcntl
+    import fcntl
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_json(path, data):
+    # Write then rename, so readers never see a partial file
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _merge_snapshots(paths):
+    merged = {}
+    for path in paths:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # Removed by the master, or written by an older version
+            continue
+        for name, entry in data.items():
+            metric = merged.get(name)
+            if metric is None:
+                if entry['type'] == Histogram.type_name:
+                    metric = Histogram(name, entry['help'], entry['buckets'])
+                else:
+                    metric = Counter(name, entry['help'])
+                merged[name] = metric
+            metric.merge(entry['values'])
+    return merged
+
+
+def write_snapshot():
+    """Write this process's metrics to the multiprocess directory"""
+    if _multiprocess_dir is not None:
+        with _lock:
+            snapshot = _snapshot(_metrics.values())
+        _write_json(os.path.join(_multiprocess_dir, f'{os.getpid()}.json'), snapshot)
+
+
+def enable_multiprocess(directory, flush_seconds=2):
+    """Share this process's metrics through directory, refreshed every flush_seconds"""
+    global _multiprocess_dir
+    _multiprocess_dir = directory
+
+    def flush():
+        while True:
+            time.sleep(flush_seconds)
+            try:
+                write_snapshot()
+            except OSError as e:
+                print(f"Error writing metrics snapshot: {e}")
+
+    threading.Thread(target=flush, name='metrics-flush', daemon=True).start()
+
+
+def clear_multiprocess_dir(directory):
+    """Start a server run with an empty multiprocess directory"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json*')):
+        os.remove(path)
+
+
+def mark_process_dead(pid, directory):
+    """Fold an exited process's snapshot into EXITED_SNAPSHOT; called by the master only"""
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    exited = os.path.join(directory, EXITED_SNAPSHOT)
+    # Readers must not see the process counted twice, or not at all
+    with _directory_lock(directory, exclusive=True):
+        merged = _merge_snapshots([exited, path])
+        _write_json(exited, _snapshot(merged.values()))
+        os.remove(path)
@@ -1,42 +1,51 @@
 # tally_parser_interunit_loan_recon.py
 
 import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 from calendar import month_name
-from typing import Tuple, Optional
+from typing import BinaryIO, Dict, NamedTuple, Tuple, Optional, Union
+
+PERIOD_PATTERN = re.compile(r'(\d{1,2}-[A-Za-z]{3}-\d{4})\s*to\s*(\d{1,2}-[A-Za-z]{3}-\d{4})')
+UNIT_PATTERN = re.compile(r'Unit\s*:?[\s)]*([^)]+)')
+BORROWER_PATTERN = re.compile(r'A/C-([\w\s&.()/-]+)')
+HEADER_KEYWORDS = {"Date", "Particulars", "Vch Type", "Vch No.", "Debit", "Credit"}
 
 def extract_statement_period(metadata: pd.DataFrame) -> Tuple[Tuple[str, str], str, Optional[int]]:
-    period_pattern = re.compile(r'(\d{1,2}-[A-Za-z]{3}-\d{4})\s*to\s*(\d{1,2}-[A-Za-z]{3}-\d{4})')
     for i, row in metadata.iterrows():
         cell = str(row[0])
-        match = period_pattern.search(cell)
+        match = PERIOD_PATTERN.search(cell)
         if match:
             return (match.group(1), match.group(2)), cell, i
     return ("", ""), "", None
 
 def extract_lender(metadata: pd.DataFrame) -> Tuple[str, str, int]:
-    unit_pattern = re.compile(r'Unit\s*:?[\s)]*([^)]+)')
     for i, row in metadata.iterrows():
         cell = str(row[0])
-        match = unit_pattern.search(cell)
+        match = UNIT_PATTERN.search(cell)
         if match:
             return match.group(1).strip(), cell, i
     return str(metadata.iloc[0, 0]).strip(), metadata.iloc[0, 0], 0
 
+def borrower_name(match: re.Match) -> str:
+    borrower = match.group(1).strip()
+    # Remove 'Unit' or 'unit' from the end (with or without period) and clean up
+    borrower = re.sub(r'\s*[Uu]nit\.?\s*$', '', borrower).strip()
+    # Replace 'Geo Textile' with 'GeoTex'
+    if borrower == 'Geo Textile':
+        borrower = 'GeoTex'
+    return borrower
+
 def extract_borrower(metadata: pd.DataFrame) -> Tuple[str, str, int]:
-    pattern = re.compile(r'A/C-([\w\s&.()/-]+)')
     for i, row in metadata.iterrows():
         cell = str(row[0])
-        match = pattern.search(cell)
+        match = BORROWER_PATTERN.search(cell)
         if match:
-            borrower = match.group(1).strip()
-            # Remove 'Unit' or 'unit' from the end (with or without period) and clean up
-            borrower = re.sub(r'\s*[Uu]nit\.?\s*$', '', borrower).strip()
-            # Replace 'Geo Textile' with 'GeoTex'
-            if borrower == 'Geo Textile':
-                borrower = 'GeoTex'
-            return borrower, cell, i
+            return borrower_name(match), cell, i
     return "", "", None
 
 def clean(val) -> str:
@@ -50,37 +59,171 @@ def clean(val) -> str:
     cleaned = re.sub(r'\s+', ' ', cleaned)
     return cleaned.strip()
 
-def deduplicate_row(row, dup_map):
-    res = row[:]
+def clean_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    # Column-wise equivalent of clean() on every cell
+    cleaned = {}
+    for col in frame.columns:
+        values = frame[col]
+        text = values.astype(str).where(values.notna(), "")
+        cleaned[col] = (text.str.strip()
+                        .str.replace('_x000D_', ' ', regex=False)
+                        .str.replace('\r', ' ', regex=False)
+                        .str.replace('\n', ' ', regex=False)
+                        .str.replace(r'\s+', ' ', regex=True)
+                        .str.strip())
+    return pd.DataFrame(cleaned, index=frame.index, columns=frame.columns, dtype=object)
+
+def deduplicate_rows(frame: pd.DataFrame, dup_map) -> pd.DataFrame:
+    # Blank repeated values in the duplicated column groups, keeping the first per row
     for val, idxs in dup_map.items():
-        found = False
+        found = np.zeros(len(frame), dtype=bool)
         for i in idxs:
-            if clean(res[i]) == val:
-                if found:
-                    res[i] = ""
-                else:
-                    found = True
-    return res
-
-def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
-    wb = load_workbook(file_path, data_only=True)
-    ws = wb[sheet_name]
+            equal = (frame[i] == val).to_numpy()
+            frame.loc[equal & found, i] = ""
+            found |= equal
+    return frame
+
+class ParsePlan(NamedTuple):
+    """Layout of one recurring Tally export, as found by full discovery"""
+    header_row_idx: int
+    header_signature: Tuple[str, ...]  # cleaned header row before unmerging
+    raw_headers: Tuple[str, ...]       # header row after unmerging
+    headers: Tuple[str, ...]           # renamed headers (dr_cr/Particulars)
+    period_row: Optional[int]
+    lender_row: Optional[int]
+    borrower_row: Optional[int]
+
+    @property
+    def fingerprint(self) -> Tuple[int, Tuple[str, ...]]:
+        return self.header_row_idx, self.header_signature
+
+PLAN_CACHE_SIZE = 64
+_plan_cache: "OrderedDict[Tuple[int, Tuple[str, ...]], ParsePlan]" = OrderedDict()
+_plan_lock = threading.Lock()
+
+def read_row(ws, row_idx: int) -> Tuple:
+    return next(ws.iter_rows(min_row=row_idx, max_row=row_idx, values_only=True), ())
+
+def lookup_plan(ws) -> Optional[ParsePlan]:
+    # Most recently used plan whose header row is found at the same position
+    with _plan_lock:
+        plans = list(reversed(_plan_cache.values()))
+    for plan in plans:
+        if plan.header_row_idx <= ws.max_row and \
+                tuple(clean(c) for c in read_row(ws, plan.header_row_idx)) == plan.header_signature:
+            with _plan_lock:
+                if plan.fingerprint in _plan_cache:
+                    _plan_cache.move_to_end(plan.fingerprint)
+            return plan
+    return None
+
+def store_plan(plan: ParsePlan) -> None:
+    with _plan_lock:
+        _plan_cache[plan.fingerprint] = plan
+        _plan_cache.move_to_end(plan.fingerprint)
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+
+def read_metadata(ws, header_row_idx: int) -> list:
+    # Cleaned rows above the header
+    return [[clean(c) for c in row] for row in ws.iter_rows(min_row=1, max_row=header_row_idx-1, values_only=True)]
+
+def match_row(pattern: re.Pattern, metadata_rows, row: Optional[int]) -> Optional[re.Match]:
+    # Match on the first cell of the metadata row recorded in a plan. Rows above
+    # it must not match, since the extract_* scans would return the first one.
+    if row is None or row >= len(metadata_rows):
+        return None
+    cells = [str(r[0]) if r else "" for r in metadata_rows[:row + 1]]
+    if any(pattern.search(cell) for cell in cells[:row]):
+        return None
+    return pattern.search(cells[row])
+
+def rename_headers(raw_headers) -> list:
+    # The first "Particulars" column holds Dr/Cr, the one after it the narration
+    headers = list(raw_headers)
+    headers = ["dr_cr" if h == "Particulars" and i == headers.index("Particulars") else h for i, h in enumerate(headers)]
+    particulars_index = headers.index("dr_cr") + 1
+    if particulars_index < len(headers):
+        headers[particulars_index] = "Particulars"
+    return headers
 
-    header_keywords = {"Date", "Particulars", "Vch Type", "Vch No.", "Debit", "Credit"}
-    header_row_idx = next((i for i, r in enumerate(ws.iter_rows(values_only=True), 1)
-                           if header_keywords.issubset({clean(c) for c in r})), None)
-    if not header_row_idx:
-        wb.close()
-        raise ValueError("Header row not found.")
+def to_hex(val) -> str:
+    try:
+        return hex(int(float(val)))[2:]
+    except Exception:
+        return ""
 
-    metadata_rows = []
-    for row in ws.iter_rows(min_row=1, max_row=header_row_idx-1, values_only=True):
-        metadata_rows.append([clean(c) for c in row])
-    metadata = pd.DataFrame(metadata_rows)
+def amount_hex(val) -> str:
+    # Rounded amount as hex, the scalar reference for amounts_to_hex()
+    try:
+        return to_hex(round(float(str(val).replace(",", ""))))
+    except Exception:
+        return ""
+
+def amounts_to_hex(values: pd.Series) -> pd.Series:
+    text = values.astype(str).str.replace(",", "", regex=False)
+    amounts = pd.to_numeric(text, errors="coerce")
+    regular = amounts.notna() & np.isfinite(amounts) & (amounts.abs() < 2 ** 62)
+    result = pd.Series("", index=values.index, dtype=object)
+    if regular.any():
+        rounded = pd.Series(np.round(amounts[regular].to_numpy()).astype(np.int64), index=amounts[regular].index)
+        result[regular] = rounded.map(hex).str[2:]
+    # Blanks and anything pandas can't parse take the scalar path
+    if (~regular).any():
+        result[~regular] = values[~regular].map(amount_hex)
+    return result
+
+def parse_tally_file(file_path: Union[str, BinaryIO], sheet_name: str, timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    # file_path may also be an open binary file, e.g. an upload buffered in memory.
+    # Phase durations in seconds are written to `timings` when a dict is passed
+    if timings is None:
+        timings = {}
+    phase_start = time.perf_counter()
+
+    def end_phase(name):
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[name] = now - phase_start
+        phase_start = now
 
-    (period_start, period_end), _, period_row = extract_statement_period(metadata)
-    lender, _, lender_row = extract_lender(metadata)
-    borrower, _, borrower_row = extract_borrower(metadata)
+    wb = load_workbook(file_path, data_only=True)
+    ws = wb[sheet_name]
+    end_phase("load")
+
+    # Recurring exports reuse a cached plan: one header row is checked
+    # instead of scanning for it, and metadata is read from known rows
+    plan = lookup_plan(ws)
+    if plan:
+        metadata_rows = read_metadata(ws, plan.header_row_idx)
+        if any(HEADER_KEYWORDS.issubset(row) for row in metadata_rows):
+            # An earlier row also qualifies as the header, so the plan does not apply
+            plan = None
+    if plan:
+        header_row_idx = plan.header_row_idx
+        header_signature = plan.header_signature
+    else:
+        header_row_idx = next((i for i, r in enumerate(ws.iter_rows(values_only=True), 1)
+                               if HEADER_KEYWORDS.issubset({clean(c) for c in r})), None)
+        if not header_row_idx:
+            wb.close()
+            raise ValueError("Header row not found.")
+        header_signature = tuple(clean(c) for c in read_row(ws, header_row_idx))
+        metadata_rows = read_metadata(ws, header_row_idx)
+    end_phase("header_scan")
+
+    period_match = match_row(PERIOD_PATTERN, metadata_rows, plan.period_row) if plan else None
+    lender_match = match_row(UNIT_PATTERN, metadata_rows, plan.lender_row) if plan else None
+    borrower_match = match_row(BORROWER_PATTERN, metadata_rows, plan.borrower_row) if plan else None
+    if period_match and lender_match and borrower_match:
+        period_start, period_end = period_match.group(1), period_match.group(2)
+        lender = lender_match.group(1).strip()
+        borrower = borrower_name(borrower_match)
+        period_row, lender_row, borrower_row = plan.period_row, plan.lender_row, plan.borrower_row
+    else:
+        metadata = pd.DataFrame(metadata_rows)
+        (period_start, period_end), _, period_row = extract_statement_period(metadata)
+        lender, _, lender_row = extract_lender(metadata)
+        borrower, _, borrower_row = extract_borrower(metadata)
 
     ledger_date = ""
     ledger_year = ""
@@ -94,6 +237,7 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
                 ledger_year = str(first_date.year)
         except Exception:
             pass
+    end_phase("metadata")
 
     for rng in list(ws.merged_cells.ranges):
         val = ws[rng.coord.split(":")[0]].value
@@ -101,46 +245,60 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
         for row in ws[rng.coord]:
             for cell in row:
                 cell.value = val
+    end_phase("unmerge")
 
-    headers = [clean(c.value) if c.value else f"Unnamed_{i+1}" for i, c in enumerate(ws[header_row_idx])]
+    raw_headers = tuple(clean(c.value) if c.value else f"Unnamed_{i+1}" for i, c in enumerate(ws[header_row_idx]))
+    if plan and plan.raw_headers == raw_headers:
+        headers = list(plan.headers)
+    else:
+        headers = rename_headers(raw_headers)
 
-    headers = ["dr_cr" if h == "Particulars" and i == headers.index("Particulars") else h for i, h in enumerate(headers)]
-    particulars_index = headers.index("dr_cr") + 1
-    if particulars_index < len(headers):
-        headers[particulars_index] = "Particulars"
+    new_plan = ParsePlan(header_row_idx, header_signature, raw_headers, tuple(headers),
+                         period_row, lender_row, borrower_row)
+    if new_plan != plan:
+        store_plan(new_plan)
 
     num_cols = len(headers)
 
+    # Clean all body cells column-wise, truncated/padded to the header width
+    raw = pd.DataFrame(list(ws.iter_rows(min_row=header_row_idx + 1, values_only=True)), dtype=object)
+    raw = raw.iloc[:, :num_cols].reindex(columns=range(num_cols))
+    body = clean_frame(raw)
+    entered_by_cells = np.column_stack([
+        body[col].str.lower().str.contains("entered by :", regex=False).to_numpy(dtype=bool)
+        for col in body.columns
+    ]) if len(body) else np.zeros((0, num_cols), dtype=bool)
+    has_entered_by = entered_by_cells.any(axis=1)
+    first_entered_by = entered_by_cells.argmax(axis=1)
+
+    date_idx = headers.index("Date") if "Date" in headers else None
+    dr_cr_idx = headers.index("dr_cr") if "dr_cr" in headers else None
+    particulars_idx = headers.index("Particulars") if "Particulars" in headers else None
+
     collapsed_rows = []
     entered_by_list = []
     current_row = None
     last_entered_by = ""
-    for row in ws.iter_rows(min_row=header_row_idx + 1, values_only=True):
-        cleaned = [clean(c) for c in row][:num_cols] + ["" for _ in range(num_cols - len(row))]
-        entered_by_found = False
-        for idx, cell in enumerate(cleaned):
-            if "entered by :" in cell.lower():
-                for next_idx in range(idx + 1, len(cleaned)):
-                    if cleaned[next_idx]:
-                        last_entered_by = cleaned[next_idx]
-                        break
-                else:
-                    match = re.search(r"entered by\s*:\s*(.*)", cell, re.IGNORECASE)
-                    if match:
-                        last_entered_by = match.group(1).strip()
-                entered_by_found = True
-                break
+    for cleaned, entered_by_found, idx in zip(body.values.tolist(), has_entered_by, first_entered_by):
         if entered_by_found:
+            cell = cleaned[idx]
+            for next_idx in range(idx + 1, len(cleaned)):
+                if cleaned[next_idx]:
+                    last_entered_by = cleaned[next_idx]
+                    break
+            else:
+                match = re.search(r"entered by\s*:\s*(.*)", cell, re.IGNORECASE)
+                if match:
+                    last_entered_by = match.group(1).strip()
             continue
         if (
-            (not cleaned[headers.index("Date")] if "Date" in headers else True)
-            and (not cleaned[headers.index("dr_cr")] if "dr_cr" in headers else True)
-            and (cleaned[headers.index("Particulars")] if "Particulars" in headers else False)
+            (not cleaned[date_idx] if date_idx is not None else True)
+            and (not cleaned[dr_cr_idx] if dr_cr_idx is not None else True)
+            and (cleaned[particulars_idx] if particulars_idx is not None else False)
             and current_row is not None
         ):
-            idx = headers.index("Particulars")
             # Use space instead of newline since we're cleaning newlines
-            current_row[idx] = (current_row[idx] + " " + cleaned[idx]).strip()
+            current_row[particulars_idx] = (current_row[particulars_idx] + " " + cleaned[particulars_idx]).strip()
         else:
             if current_row is not None:
                 collapsed_rows.append(current_row)
@@ -154,7 +312,9 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
     wb.close()
     dedup_map = {v: idxs for v, idxs in pd.Series(collapsed_rows[0]).groupby(
         lambda x: x).groups.items() if len(idxs) > 1}
-    data_rows = [deduplicate_row(row, dedup_map) for row in collapsed_rows]
+    data_rows = deduplicate_rows(pd.DataFrame(collapsed_rows, dtype=object), dedup_map).values.tolist()
+
+    end_phase("collapse")
 
     if all(clean(v).replace('.', '', 1).replace(',', '', 1).isdigit() or clean(v) == "" for v in data_rows[-1]):
         data_rows.pop(-1)
@@ -174,33 +334,24 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
         df = df[df["Particulars"].str.strip().str.lower() != "opening balance"]
         df = df[~df["Particulars"].str.strip().str.lower().str.startswith("closing balance")]
 
-    def to_hex(val: str) -> str:
-        try:
-            return hex(int(float(val)))[2:]
-        except Exception:
-            return ""
-
-    uids = []
-    rownum = 1
-    for i, row in df.iterrows():
-        date_val = row.get("Date", "")
-        credit_val = row.get("Credit", "")
-        debit_val = row.get("Debit", "")
-        balance_val = credit_val if (pd.notna(credit_val) and str(credit_val).strip() != "") else debit_val
-        if pd.notna(date_val) and date_val != "":
-            date_str = str(date_val).replace("-", "")
-            hexdate = to_hex(date_str)
-            try:
-                hexbal = to_hex(round(float(str(balance_val).replace(",", ""))))
-            except Exception:
-                hexbal = ""
-            # Add lender prefix to make tally_uid unique across files
-            uid = f"{lender}_{hexdate}_{hexbal}_{rownum:06d}"
-            uids.append(uid)
-            rownum += 1
-        else:
-            uids.append("")
-    df["tally_uid"] = uids
+    # uid = lender_hexdate_hexbalance_rownum, numbered over dated rows only
+    blank = pd.Series("", index=df.index, dtype=object)
+    date_vals = df["Date"] if "Date" in df.columns else blank
+    credit_vals = df["Credit"] if "Credit" in df.columns else blank
+    debit_vals = df["Debit"] if "Debit" in df.columns else blank
+    use_credit = credit_vals.notna() & (credit_vals.astype(str).str.strip() != "")
+    balance_vals = credit_vals.where(use_credit, debit_vals)
+    dated = (date_vals.notna() & (date_vals != "")).to_numpy(dtype=bool)
+
+    uids = pd.Series("", index=df.index, dtype=object)
+    if dated.any():
+        hexdate = date_vals[dated].astype(str).str.replace("-", "", regex=False).map(to_hex)
+        hexbal = amounts_to_hex(balance_vals[dated])
+        rownum = pd.Series(np.arange(1, dated.sum() + 1), index=hexdate.index).astype(str).str.zfill(6)
+        # Add lender prefix to make tally_uid unique across files
+        uids[dated] = f"{lender}_" + hexdate + "_" + hexbal + "_" + rownum
+    df["tally_uid"] = uids.tolist()
+    end_phase("uid_generation")
     cols = ["tally_uid", "lender", "borrower", "statement_month", "statement_year"] + \
         [c for c in df.columns if c not in ["tally_uid", "lender", "borrower", "statement_month", "statement_year"]]
 
@@ -210,10 +361,12 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
     df["statement_year"] = ledger_year
     df = df[cols]
 
-    if "Debit" in df.columns:
-        df["Debit"] = df["Debit"].apply(lambda x: None if str(x).strip() == '' else x)
-    if "Credit" in df.columns:
-        df["Credit"] = df["Credit"].apply(lambda x: None if str(x).strip() == '' else x)
+    for col in ("Debit", "Credit"):
+        if col in df.columns:
+            values = df[col].astype(object)
+            values[values.astype(str).str.strip() == ''] = None
+            # Assign as a list so pandas infers the dtype exactly as a row-wise apply would
+            df[col] = values.tolist()
 
     new_column_names = {
         "Date": "Date",
@@ -224,6 +377,7 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
         "Credit": "Credit",
     }
     df = df.rename(columns=new_column_names)
+    end_phase("finalize")
     return df
 
 if __name__ == "__main__":
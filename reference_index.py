@@ -0,0 +1,176 @@
+import re
+from collections import defaultdict
+
+PO_PATTERN = re.compile(r'.*/PO/[^/]*/[^/]*/[^/]*')
+LC_PATTERN = re.compile(r'L/C-([^/\s]+(?:\/[^/\s]+)*)')
+
+# Similarity given to a fuzzy reference match: below the 0.7 band shown as
+# a confirmed-looking match, so strong keyword matches win in one-to-one
+# selection and swapped references stay flagged for review. Lowered per
+# extra swap so closer references win when a row has several candidates.
+FUZZY_BASE_SCORE = 0.65
+FUZZY_SWAP_PENALTY = 0.05
+
+
+def extract_core_po(po_text):
+    """Core PO reference like FOB/PO/2023/8/5023, ending with digits"""
+    m = re.search(r'([A-Z]+/PO/\d+/\d+/\d+)', po_text)
+    if m:
+        return m.group(1)
+    # fallback: match up to last digit group
+    m = re.search(r'([A-Z]+/PO/[^/]+/[^/]+/\d+)', po_text)
+    if m:
+        return m.group(1)
+    return po_text
+
+
+def extract_core_lc(lc_text):
+    """Core L/C reference like L/C-187724010124/24, ending with digits"""
+    m = re.search(r'(L/C-\d+(?:/\d+)+)', lc_text)
+    if m:
+        return m.group(1)
+    # fallback: match up to last digit group
+    m = re.search(r'(L/C-[^/]+(?:/[^/]+)*?/\d+)', lc_text)
+    if m:
+        return m.group(1)
+    return lc_text
+
+
+def po_reference(text):
+    """Core PO reference in a Particulars text, or None"""
+    m = PO_PATTERN.search(str(text))
+    return extract_core_po(m.group(0)) if m else None
+
+
+def lc_reference(text):
+    """Core L/C reference in a Particulars text, or None"""
+    m = LC_PATTERN.search(str(text))
+    return extract_core_lc(m.group(0)) if m else None
+
+
+def extract_references(text):
+    """PO and L/C references found in a Particulars text"""
+    if not text:
+        return []
+    return [ref for ref in (po_reference(text), lc_reference(text)) if ref]
+
+
+def transposition_distance(a, b, max_swaps):
+    """Number of disjoint adjacent swaps turning a into b, or None
+
+    Only swapped characters count: references that differ by a changed,
+    added or dropped character (FOB/PO/2023/8/5023 vs .../5024) are
+    usually a different PO, not a typo, and return None.
+    """
+    if len(a) != len(b):
+        return None
+    swaps = 0
+    i = 0
+    while i < len(a):
+        if a[i] == b[i]:
+            i += 1
+        elif i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i]:
+            swaps += 1
+            if swaps > max_swaps:
+                return None
+            i += 2
+        else:
+            return None
+    return swaps
+
+
+def fuzzy_score(swaps):
+    return FUZZY_BASE_SCORE - FUZZY_SWAP_PENALTY * (max(swaps, 1) - 1)
+
+
+def swap_keys(reference, max_swaps):
+    """Keys shared by every reference within max_swaps adjacent swaps
+
+    A key is the reference with the characters of up to max_swaps
+    disjoint adjacent pairs put in sorted order, together with those
+    pairs' positions. Swapping a pair does not change its sorted form, so
+    two references one swap apart share the key of that pair, while
+    references that differ in any other way (the next serial number
+    under the same FOB/PO/2023/8/ prefix) share none.
+    """
+    keys = set()
+
+    def normalize(text, positions, first, swaps_left):
+        for i in range(first, len(text) - 1):
+            ordered = text[:i] + ''.join(sorted(text[i:i + 2])) + text[i + 2:]
+            keys.add((positions + (i,), ordered))
+            if swaps_left > 1:
+                normalize(ordered, positions + (i,), i + 2, swaps_left - 1)
+
+    normalize(reference, (), 0, max_swaps)
+    return keys
+
+
+class ReferenceIndex:
+    """Inverted index from swap keys to the references that produce them
+
+    A lookup reads only the postings of the query's own keys, which hold
+    exactly the references within max_swaps swaps of it, so its cost
+    follows the number of such references rather than the size of the
+    index. transposition_distance then counts the swaps.
+    """
+
+    def __init__(self, max_swaps):
+        self.max_swaps = max_swaps
+        self.entries = []
+        self.postings = defaultdict(list)
+
+    def add(self, key, reference):
+        entry = len(self.entries)
+        self.entries.append((key, reference))
+        for swap_key in swap_keys(reference, self.max_swaps):
+            self.postings[swap_key].append(entry)
+
+    def candidates(self, reference):
+        """Entries sharing a swap key with reference"""
+        candidates = set()
+        for swap_key in swap_keys(reference, self.max_swaps):
+            candidates.update(self.postings.get(swap_key, ()))
+        return candidates
+
+    def search(self, reference):
+        """(key, indexed reference, swaps) for entries within max_swaps adjacent swaps"""
+        results = []
+        for entry in self.candidates(reference):
+            key, indexed = self.entries[entry]
+            swaps = transposition_distance(reference, indexed, self.max_swaps)
+            if swaps is not None:
+                results.append((key, indexed, swaps))
+        return results
+
+
+def fuzzy_reference_pairs(credits, debits, max_swaps):
+    """Same-amount credit/debit pairs whose references differ by adjacent swaps
+
+    credits and debits are iterables of (key, amount, particulars). Only
+    pairs of equal amount are ever scored, so one index is built per
+    amount bucket present on both sides. Returns a dict
+    {(credit_key, debit_key): (swaps, credit_reference, debit_reference)}
+    keeping the closest reference pair for each.
+    """
+    if max_swaps <= 0:
+        return {}
+
+    indexes = {}
+    for key, amount, particulars in debits:
+        for reference in extract_references(particulars):
+            if amount not in indexes:
+                indexes[amount] = ReferenceIndex(max_swaps)
+            indexes[amount].add(key, reference)
+
+    pairs = {}
+    for credit_key, amount, particulars in credits:
+        index = indexes.get(amount)
+        if index is None:
+            continue
+        for reference in extract_references(particulars):
+            for debit_key, debit_reference, swaps in index.search(reference):
+                best = pairs.get((credit_key, debit_key))
+                if best is None or swaps < best[0]:
+                    pairs[(credit_key, debit_key)] = (swaps, reference, debit_reference)
+    return pairs
@@ -0,0 +1,87 @@
+import contextvars
+import logging
+import re
+import time
+from sqlalchemy import event
+import config
+import metrics
+
+slow_query_log = logging.getLogger('sql_trace.slow')
+
+query_seconds = metrics.histogram('recon_sql_query_duration_seconds', 'SQL statement latency by calling endpoint')
+query_rows = metrics.counter('recon_sql_rows_total', 'Rows affected or returned by SQL statements')
+
+# Per-request accumulator, set by begin_request()
+_current = contextvars.ContextVar('sql_trace_current', default=None)
+
+
+class RequestSummary:
+    """Query count and total DB time for one request or batch run"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.query_count = 0
+        self.total_seconds = 0.0
+
+    def header_value(self):
+        return f'queries={self.query_count}; db_time_ms={self.total_seconds * 1000:.1f}'
+
+
+def begin_request(endpoint):
+    """Start collecting statement timings for the current request"""
+    summary = RequestSummary(endpoint or 'unknown')
+    _current.set(summary)
+    return summary
+
+
+def end_request():
+    """Stop collecting and return the summary of the current request"""
+    summary = _current.get()
+    _current.set(None)
+    return summary
+
+
+def _short_statement(statement, limit=500):
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.sql_trace_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'sql_trace_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else 0
+
+    summary = _current.get()
+    endpoint = summary.endpoint if summary else 'none'
+    if summary:
+        summary.query_count += 1
+        summary.total_seconds += elapsed
+
+    query_seconds.observe(elapsed, endpoint=endpoint)
+    query_rows.inc(rows, endpoint=endpoint)
+
+    if elapsed * 1000 >= config.SQL_SLOW_QUERY_MS:
+        slow_query_log.warning(
+            '%.1f ms rows=%d endpoint=%s executemany=%s sql=%s',
+            elapsed * 1000, rows, endpoint, executemany, _short_statement(statement)
+        )
+
+
+def install(engine):
+    """Attach tracing hooks to an engine and open the slow-query log"""
+    if not slow_query_log.handlers:
+        handler = logging.FileHandler(config.SQL_SLOW_QUERY_LOG)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_log.addHandler(handler)
+        slow_query_log.setLevel(logging.WARNING)
+        slow_query_log.propagate = False
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -146,70 +146,31 @@ async function uploadFile() {
     }
 }
 
-// Load data from API
-async function loadData() {
-    try {
-        const response = await fetch('/api/data');
-        const result = await response.json();
-        
-        if (response.ok) {
-            displayData(result.data, result.column_order);
-        } else {
-            console.error('Error loading data:', result.error);
-        }
-    } catch (error) {
-        console.error('Error loading data:', error);
-    }
-}
+// Load data from API into a virtualized table that fetches pages on demand
+let dataTable = null;
 
-// Display data in table
-function displayData(data, columnOrder) {
+function loadData() {
     const resultDiv = document.getElementById('data-table-result');
     
-    if (!data || data.length === 0) {
-        resultDiv.innerHTML = `
+    dataTable = new VirtualTable(resultDiv, {
+        columns: [],
+        fetchPage: async (offset, limit) => {
+            const response = await fetch(`/api/data?offset=${offset}&limit=${limit}`);
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error);
+            }
+            // Use the column order from backend
+            const columns = (result.column_order || []).map(col => ({ key: col, label: col }));
+            return { rows: result.data, total: result.total, columns: columns };
+        },
+        emptyHTML: `
             <div style="text-align: center; color: #666; padding: 20px;">
                 No data available. Upload a file to get started.
             </div>
-        `;
-        return;
-    }
-    
-    // Use the column order from backend, fallback to Object.keys if not provided
-    const columns = columnOrder || Object.keys(data[0]);
-    
-    // Debug: Print the column order received by frontend
-    console.log("Frontend received columns:", columns);
-    
-    let tableHTML = `
-        <div class="report-table-wrapper" style="max-height: 70vh; overflow-y: auto;">
-            <table class="report-table" style="border-collapse: collapse;">
-                <thead style="position: sticky; top: 0; background-color: #f8f9fa; z-index: 1;">
-                    <tr>
-                        ${columns.map(col => `<th style="border: 1px solid #dee2e6; padding: 8px; text-align: left; background-color: #f8f9fa;">${col}</th>`).join('')}
-                    </tr>
-                </thead>
-                <tbody>
-    `;
-    
-    data.forEach(row => {
-        tableHTML += `
-            <tr>
-                ${columns.map(col => `<td style="border: 1px solid #dee2e6; padding: 8px;">${row[col] === null || row[col] === undefined ? '' : row[col]}</td>`).join('')}
-            </tr>
-        `;
+        `
     });
-    
-    tableHTML += `
-                </tbody>
-            </table>
-        </div>
-        <div style="margin-top: 10px; color: #666;">
-            Total records: ${data.length}
-        </div>
-    `;
-    
-    resultDiv.innerHTML = tableHTML;
+    dataTable.load().catch(error => console.error('Error loading data:', error));
 }
 
 // Helper function to get badge class for match status
@@ -254,151 +215,122 @@ async function runReconciliation() {
     }
 }
 
+let matchesTable = null;
+
 async function loadMatches() {
     const resultDiv = document.getElementById('reconciliation-result');
     resultDiv.innerHTML = '<div style="color: blue;">Loading matches...</div>';
     
     try {
-        const response = await fetch('/api/matches');
-        const result = await response.json();
-        
-        if (response.ok) {
-            displayMatches(result.matches);
-        } else {
-            resultDiv.innerHTML = `<div style="color: red;">Failed to load matches: ${result.error}</div>`;
-        }
-        
+        await displayMatches();
     } catch (error) {
         resultDiv.innerHTML = `<div style="color: red;">Failed to load matches: ${error.message}</div>`;
     }
 }
 
-function displayMatches(matches) {
-    const resultDiv = document.getElementById('reconciliation-result');
+// Flatten a match row into Steel (lender) and GeoTex (borrower) sides
+function toMatchRow(match) {
+    const own = {
+        Date: match.Date,
+        Particulars: match.Particulars,
+        Credit: match.Credit,
+        Debit: match.Debit
+    };
+    const matched = {
+        Date: match.matched_date,
+        Particulars: match.matched_particulars,
+        Credit: match.matched_Credit,
+        Debit: match.matched_Debit
+    };
+    // Current record is GeoTex only when its counterpart is Steel
+    const isGeotex = match.lender !== 'Steel' && match.matched_lender === 'Steel';
+    const steelRecord = isGeotex ? matched : own;
+    const geotexRecord = isGeotex ? own : matched;
     
-    if (!matches || matches.length === 0) {
-        resultDiv.innerHTML = `
-            <div style="text-align: center; color: #666; padding: 20px;">
-                No matches found. Run reconciliation to find matching transactions.
-            </div>
-        `;
-        return;
-    }
-    
-    let tableHTML = `
-        <div class="report-table-wrapper">
-            <h4>Matched Transactions (${matches.length} pairs)</h4>
-            <table class="report-table">
-                <thead>
-                    <tr>
-                        <th colspan="4" style="text-align: center; background-color: #e3f2fd;">Steel (Lender)</th>
-                        <th colspan="4" style="text-align: center; background-color: #f3e5f5;">GeoTex (Borrower)</th>
-                        <th>Match Score</th>
-                        <th>Keywords</th>
-                        <th>Actions</th>
-                    </tr>
-                    <tr>
-                        <th>Date</th>
-                        <th>Particulars</th>
-                        <th>Credit</th>
-                        <th>Debit</th>
-                        <th>Date</th>
-                        <th>Particulars</th>
-                        <th>Credit</th>
-                        <th>Debit</th>
-                        <th>Similarity</th>
-                        <th>Matching keywords</th>
-                        <th>Accept/Reject</th>
-                    </tr>
-                </thead>
-                <tbody>
-    `;
+    return {
+        tally_uid: match.tally_uid,
+        steel_date: formatDate(steelRecord.Date),
+        steel_particulars: steelRecord.Particulars || '',
+        steel_credit: steelRecord.Credit,
+        steel_debit: steelRecord.Debit,
+        geotex_date: formatDate(geotexRecord.Date),
+        geotex_particulars: geotexRecord.Particulars || '',
+        geotex_credit: geotexRecord.Credit,
+        geotex_debit: geotexRecord.Debit,
+        match_score: match.match_score,
+        keywords: match.keywords || match.matched_keywords || ''
+    };
+}
+
+function displayMatches() {
+    const resultDiv = document.getElementById('reconciliation-result');
+    const amount = (key, color) => ({
+        key: key,
+        label: key.endsWith('credit') ? 'Credit' : 'Debit',
+        className: `vt-amount vt-${color}`,
+        render: row => formatAmount(row[key] || 0)
+    });
     
-    matches.forEach(match => {
-        // Determine which record is Steel and which is GeoTex based on lender field
-        let steelRecord, geotexRecord;
-        
-        if (match.lender === 'Steel') {
-            // This record is Steel, get GeoTex from matched data
-            steelRecord = {
-                Date: match.Date,
-                Particulars: match.Particulars,
-                Credit: match.Credit,
-                Debit: match.Debit
-            };
-            geotexRecord = {
-                Date: match.matched_date,
-                Particulars: match.matched_particulars,
-                Credit: match.matched_Credit,
-                Debit: match.matched_Debit
-            };
-        } else if (match.matched_lender === 'Steel') {
-            // This record is GeoTex, get Steel from matched data
-            geotexRecord = {
-                Date: match.Date,
-                Particulars: match.Particulars,
-                Credit: match.Credit,
-                Debit: match.Debit
-            };
-            steelRecord = {
-                Date: match.matched_date,
-                Particulars: match.matched_particulars,
-                Credit: match.matched_Credit,
-                Debit: match.matched_Debit
-            };
-        } else {
-            // Fallback: assume current record is Steel if we can't determine
-            steelRecord = {
-                Date: match.Date,
-                Particulars: match.Particulars,
-                Credit: match.Credit,
-                Debit: match.Debit
-            };
-            geotexRecord = {
-                Date: match.matched_date,
-                Particulars: match.matched_particulars,
-                Credit: match.matched_Credit,
-                Debit: match.matched_Debit
-            };
-        }
-        
-        tableHTML += `
+    matchesTable = new VirtualTable(resultDiv, {
+        title: 'Matched Transactions ({total} pairs)',
+        headerHTML: `
             <tr>
-                <td>${formatDate(steelRecord.Date)}</td>
-                <td>${steelRecord.Particulars || ''}</td>
-                <td style="text-align: right; color: green;">${formatAmount(steelRecord.Credit || 0)}</td>
-                <td style="text-align: right; color: red;">${formatAmount(steelRecord.Debit || 0)}</td>
-                <td>${formatDate(geotexRecord.Date)}</td>
-                <td>${geotexRecord.Particulars || ''}</td>
-                <td style="text-align: right; color: green;">${formatAmount(geotexRecord.Credit || 0)}</td>
-                <td style="text-align: right; color: red;">${formatAmount(geotexRecord.Debit || 0)}</td>
-                <td style="text-align: center;">
-                    <span class="badge ${match.match_score > 0.7 ? 'bg-success' : match.match_score > 0.5 ? 'bg-warning' : 'bg-danger'}">
-                        ${(match.match_score * 100).toFixed(0)}%
+                <th colspan="4" style="text-align: center; background-color: #e3f2fd;">Steel (Lender)</th>
+                <th colspan="4" style="text-align: center; background-color: #f3e5f5;">GeoTex (Borrower)</th>
+                <th>Match Score</th>
+                <th>Keywords</th>
+                <th>Actions</th>
+            </tr>
+        `,
+        columns: [
+            { key: 'steel_date', label: 'Date' },
+            { key: 'steel_particulars', label: 'Particulars' },
+            amount('steel_credit', 'green'),
+            amount('steel_debit', 'red'),
+            { key: 'geotex_date', label: 'Date' },
+            { key: 'geotex_particulars', label: 'Particulars' },
+            amount('geotex_credit', 'green'),
+            amount('geotex_debit', 'red'),
+            {
+                key: 'match_score',
+                label: 'Similarity',
+                className: 'vt-center',
+                render: row => `
+                    <span class="badge ${row.match_score > 0.7 ? 'bg-success' : row.match_score > 0.5 ? 'bg-warning' : 'bg-danger'}">
+                        ${(row.match_score * 100).toFixed(0)}%
                     </span>
-                </td>
-                <td style="font-size: 10px; max-width: 150px; word-wrap: break-word;">
-                    ${match.keywords || match.matched_keywords || ''}
-                </td>
-                <td style="text-align: center;">
-                    <button class="btn btn-success btn-sm me-1" onclick="acceptMatch('${match.tally_uid}')" title="Accept Match">
+                `
+            },
+            { key: 'keywords', label: 'Matching keywords', className: 'vt-keywords' },
+            {
+                key: 'tally_uid',
+                label: 'Accept/Reject',
+                className: 'vt-center',
+                render: row => `
+                    <button class="btn btn-success btn-sm me-1" onclick="acceptMatch('${escapeHtml(row.tally_uid)}')" title="Accept Match">
                         <i class="bi bi-check-lg"></i>
                     </button>
-                    <button class="btn btn-danger btn-sm" onclick="rejectMatch('${match.tally_uid}')" title="Reject Match">
+                    <button class="btn btn-danger btn-sm" onclick="rejectMatch('${escapeHtml(row.tally_uid)}')" title="Reject Match">
                         <i class="bi bi-x-lg"></i>
                     </button>
-                </td>
-            </tr>
-        `;
+                `
+            }
+        ],
+        fetchPage: async (offset, limit) => {
+            const response = await fetch(`/api/matches?offset=${offset}&limit=${limit}`);
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error);
+            }
+            return { rows: result.matches.map(toMatchRow), total: result.total };
+        },
+        emptyHTML: `
+            <div style="text-align: center; color: #666; padding: 20px;">
+                No matches found. Run reconciliation to find matching transactions.
+            </div>
+        `
     });
-    
-    tableHTML += `
-                </tbody>
-            </table>
-        </div>
-    `;
-    
-    resultDiv.innerHTML = tableHTML;
+    return matchesTable.load();
 }
 
 // Accept/Reject functions
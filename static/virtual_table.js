@@ -0,0 +1,258 @@
+// Interunit Loan Reconciliation - Virtualized table
+//
+// Renders only the rows inside the scroll viewport (plus a small overscan)
+// and fetches pages from the server as the user scrolls. Sorting and
+// filtering run client-side over the rows loaded so far.
+
+class VirtualTable {
+    /**
+     * @param {HTMLElement} container - element the table is rendered into
+     * @param {Object} options
+     * @param {Array} options.columns - [{key, label, className?, render?(row)}]
+     * @param {Function} options.fetchPage - async (offset, limit) => {rows, total, columns?};
+     *     returned columns replace options.columns, for tables whose layout comes from the server
+     * @param {string} [options.headerHTML] - extra header row(s) above the column labels
+     * @param {string} [options.title] - caption, may contain {total}
+     * @param {string} [options.emptyHTML] - shown when there are no rows
+     * @param {number} [options.pageSize]
+     */
+    constructor(container, options) {
+        this.container = container;
+        this.columns = options.columns;
+        this.fetchPage = options.fetchPage;
+        this.headerHTML = options.headerHTML || '';
+        this.title = options.title || '';
+        this.emptyHTML = options.emptyHTML || '';
+        this.pageSize = options.pageSize || 200;
+        this.overscan = 10;
+        this.rowHeight = 33;
+        this.calibrated = false;
+
+        this.pages = new Map();
+        this.pending = new Set();
+        this.total = 0;
+        this.sortKey = null;
+        this.sortDir = 1;
+        this.filterText = '';
+        this.view = null;  // sorted/filtered rows when a sort or filter is active
+        this.frame = null;
+    }
+
+    async load() {
+        this.pages.clear();
+        this.pending.clear();
+        await this.loadPage(0);
+        if (this.total === 0) {
+            this.container.innerHTML = this.emptyHTML;
+            return;
+        }
+        this.build();
+        this.render();
+    }
+
+    async loadPage(pageIndex) {
+        if (this.pages.has(pageIndex) || this.pending.has(pageIndex)) {
+            return;
+        }
+        this.pending.add(pageIndex);
+        try {
+            const result = await this.fetchPage(pageIndex * this.pageSize, this.pageSize);
+            this.pages.set(pageIndex, result.rows);
+            this.total = result.total;
+            if (result.columns) {
+                this.columns = result.columns;
+            }
+        } finally {
+            this.pending.delete(pageIndex);
+        }
+    }
+
+    build() {
+        const headerCells = this.columns.map(col =>
+            `<th data-key="${col.key}" class="vt-sortable">${escapeHtml(col.label)}<span class="vt-sort-indicator"></span></th>`
+        ).join('');
+
+        this.container.innerHTML = `
+            <div class="vt-toolbar">
+                <span class="vt-title"></span>
+                <input type="search" class="form-control form-control-sm vt-filter" placeholder="Filter loaded rows...">
+            </div>
+            <div class="report-table-wrapper vt-viewport">
+                <table class="report-table virtual-table">
+                    <thead>
+                        ${this.headerHTML}
+                        <tr>${headerCells}</tr>
+                    </thead>
+                    <tbody></tbody>
+                </table>
+            </div>
+            <div class="vt-status"></div>
+        `;
+
+        this.viewport = this.container.querySelector('.vt-viewport');
+        this.tbody = this.container.querySelector('tbody');
+        this.titleEl = this.container.querySelector('.vt-title');
+        this.statusEl = this.container.querySelector('.vt-status');
+
+        this.viewport.addEventListener('scroll', () => this.scheduleRender());
+        this.container.querySelector('thead').addEventListener('click', e => {
+            const th = e.target.closest('th[data-key]');
+            if (th) {
+                this.sortBy(th.dataset.key);
+            }
+        });
+        this.container.querySelector('.vt-filter').addEventListener('input', e => {
+            this.filterText = e.target.value.trim().toLowerCase();
+            this.updateView();
+        });
+    }
+
+    scheduleRender() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.render();
+            });
+        }
+    }
+
+    loadedRows() {
+        const rows = [];
+        [...this.pages.keys()].sort((a, b) => a - b).forEach(index => {
+            rows.push(...this.pages.get(index));
+        });
+        return rows;
+    }
+
+    sortBy(key) {
+        if (this.sortKey === key) {
+            this.sortDir = -this.sortDir;
+        } else {
+            this.sortKey = key;
+            this.sortDir = 1;
+        }
+        this.container.querySelectorAll('th[data-key]').forEach(th => {
+            th.querySelector('.vt-sort-indicator').textContent =
+                th.dataset.key === key ? (this.sortDir > 0 ? ' ▲' : ' ▼') : '';
+        });
+        this.updateView();
+    }
+
+    updateView() {
+        if (!this.sortKey && !this.filterText) {
+            this.view = null;
+        } else {
+            let rows = this.loadedRows();
+            if (this.filterText) {
+                const keys = this.columns.map(col => col.key);
+                rows = rows.filter(row => keys.some(key => {
+                    const value = row[key];
+                    return value !== null && value !== undefined &&
+                        String(value).toLowerCase().includes(this.filterText);
+                }));
+            }
+            if (this.sortKey) {
+                const key = this.sortKey;
+                const dir = this.sortDir;
+                rows.sort((a, b) => compareValues(a[key], b[key]) * dir);
+            }
+            this.view = rows;
+        }
+        this.viewport.scrollTop = 0;
+        this.render();
+    }
+
+    rowCount() {
+        return this.view ? this.view.length : this.total;
+    }
+
+    rowAt(index) {
+        if (this.view) {
+            return this.view[index];
+        }
+        const page = this.pages.get(Math.floor(index / this.pageSize));
+        return page ? page[index % this.pageSize] : undefined;
+    }
+
+    render() {
+        const count = this.rowCount();
+        const viewportHeight = this.viewport.clientHeight || 400;
+        const first = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(count, Math.ceil((this.viewport.scrollTop + viewportHeight) / this.rowHeight) + this.overscan);
+
+        // Fetch any pages the window needs that are not loaded yet
+        if (!this.view) {
+            const firstPage = Math.floor(first / this.pageSize);
+            const lastPage = Math.floor(Math.max(first, last - 1) / this.pageSize);
+            for (let page = firstPage; page <= lastPage; page++) {
+                if (!this.pages.has(page)) {
+                    this.loadPage(page)
+                        .then(() => this.scheduleRender())
+                        .catch(error => console.error('Error loading rows:', error));
+                }
+            }
+        }
+
+        const colspan = this.columns.length;
+        let html = `<tr class="vt-spacer" style="height: ${first * this.rowHeight}px;"><td colspan="${colspan}"></td></tr>`;
+        for (let i = first; i < last; i++) {
+            const row = this.rowAt(i);
+            const rowClass = i % 2 ? 'vt-row vt-alt' : 'vt-row';
+            if (row === undefined) {
+                html += `<tr class="${rowClass}"><td colspan="${colspan}" class="vt-loading">Loading...</td></tr>`;
+                continue;
+            }
+            html += `<tr class="${rowClass}">${this.columns.map(col => {
+                const content = col.render ? col.render(row) : escapeHtml(formatCell(row[col.key]));
+                return `<td class="${col.className || ''}" title="${escapeHtml(formatCell(row[col.key]))}">${content}</td>`;
+            }).join('')}</tr>`;
+        }
+        html += `<tr class="vt-spacer" style="height: ${(count - last) * this.rowHeight}px;"><td colspan="${colspan}"></td></tr>`;
+        this.tbody.innerHTML = html;
+
+        // Calibrate the row height once from the first rendered row
+        const sample = this.tbody.querySelector('tr.vt-row');
+        if (!this.calibrated && sample && sample.offsetHeight) {
+            this.calibrated = true;
+            if (sample.offsetHeight !== this.rowHeight) {
+                this.rowHeight = sample.offsetHeight;
+                this.scheduleRender();
+            }
+        }
+
+        this.titleEl.textContent = this.title.replace('{total}', this.total);
+        if (this.view) {
+            const loaded = this.loadedRows().length;
+            this.statusEl.textContent = `Showing ${count} of ${loaded} loaded rows (${this.total} total)`;
+        } else {
+            this.statusEl.textContent = `Total records: ${this.total}`;
+        }
+    }
+}
+
+function compareValues(a, b) {
+    const aEmpty = a === null || a === undefined || a === '';
+    const bEmpty = b === null || b === undefined || b === '';
+    if (aEmpty || bEmpty) {
+        return aEmpty === bEmpty ? 0 : (aEmpty ? 1 : -1);
+    }
+    const aNum = Number(a);
+    const bNum = Number(b);
+    if (!isNaN(aNum) && !isNaN(bNum)) {
+        return aNum - bNum;
+    }
+    return String(a).localeCompare(String(b));
+}
+
+function formatCell(value) {
+    return value === null || value === undefined ? '' : String(value);
+}
+
+function escapeHtml(value) {
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
@@ -0,0 +1,251 @@
+from sqlalchemy import create_engine, event, inspect, text
+import config
+
+# Schema for the embedded engine. MySQL keeps its schema in
+# db_query_interunit_loan_recon.sql and is created manually.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tally_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tally_uid VARCHAR(50) UNIQUE,
+
+    Date DATE,
+    dr_cr VARCHAR(255),
+    Particulars TEXT,
+    Vch_Type VARCHAR(255),
+    Vch_No VARCHAR(255),
+    Debit DECIMAL(15,2),
+    Credit DECIMAL(15,2),
+    entered_by VARCHAR(100),
+
+    lender VARCHAR(50),
+    borrower VARCHAR(50),
+
+    statement_month VARCHAR(10),
+    statement_year VARCHAR(10),
+
+    matched_with VARCHAR(50),
+    match_status VARCHAR(10) DEFAULT 'unmatched'
+        CHECK (match_status IN ('unmatched', 'matched', 'confirmed')),
+    match_score DECIMAL(5,2),
+    reconciliation_date DATETIME,
+    confirmed_by VARCHAR(100),
+    keywords TEXT,
+    row_version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS reconciliation_pairs (
+    pair_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    debit_uid VARCHAR(50) NOT NULL,
+    credit_uid VARCHAR(50) NOT NULL,
+    match_score DECIMAL(5,2),
+    match_type VARCHAR(20),
+    keywords TEXT,
+    status VARCHAR(10) NOT NULL DEFAULT 'matched'
+        CHECK (status IN ('matched', 'confirmed', 'rejected')),
+    reviewed_by VARCHAR(100),
+    created_at DATETIME,
+    reviewed_at DATETIME
+);
+
+-- Cold storage for confirmed matches of closed statement periods,
+-- filled by database.archive_closed_periods()
+CREATE TABLE IF NOT EXISTS tally_data_archive (
+    id INTEGER PRIMARY KEY,
+    tally_uid VARCHAR(50) UNIQUE,
+
+    Date DATE,
+    dr_cr VARCHAR(255),
+    Particulars TEXT,
+    Vch_Type VARCHAR(255),
+    Vch_No VARCHAR(255),
+    Debit DECIMAL(15,2),
+    Credit DECIMAL(15,2),
+    entered_by VARCHAR(100),
+
+    lender VARCHAR(50),
+    borrower VARCHAR(50),
+
+    statement_month VARCHAR(10),
+    statement_year VARCHAR(10),
+
+    matched_with VARCHAR(50),
+    match_status VARCHAR(10),
+    match_score DECIMAL(5,2),
+    reconciliation_date DATETIME,
+    confirmed_by VARCHAR(100),
+    keywords TEXT,
+    row_version BIGINT NOT NULL DEFAULT 0,
+    archived_at DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS reconciliation_pairs_archive (
+    pair_id INTEGER PRIMARY KEY,
+    debit_uid VARCHAR(50) NOT NULL,
+    credit_uid VARCHAR(50) NOT NULL,
+    match_score DECIMAL(5,2),
+    match_type VARCHAR(20),
+    keywords TEXT,
+    status VARCHAR(10) NOT NULL,
+    reviewed_by VARCHAR(100),
+    created_at DATETIME,
+    reviewed_at DATETIME
+);
+
+-- Rows removed from tally_data (archived), so /api/data/changes can
+-- report them to delta clients
+CREATE TABLE IF NOT EXISTS tally_data_removed (
+    tally_uid VARCHAR(50) PRIMARY KEY,
+    row_version BIGINT NOT NULL,
+    removed_at DATETIME
+);
+
+-- Outstanding unmatched amounts per unit pair and statement period,
+-- kept current by database._refresh_summary on every change
+CREATE TABLE IF NOT EXISTS unmatched_summary (
+    lender VARCHAR(50) NOT NULL,
+    borrower VARCHAR(50) NOT NULL,
+    statement_year VARCHAR(10) NOT NULL,
+    statement_month VARCHAR(10) NOT NULL,
+    unmatched_debit DECIMAL(18,2) NOT NULL DEFAULT 0,
+    unmatched_credit DECIMAL(18,2) NOT NULL DEFAULT 0,
+    unmatched_rows INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME,
+    PRIMARY KEY (lender, borrower, statement_year, statement_month)
+);
+
+-- Hot and cold rows together, for history queries
+CREATE VIEW IF NOT EXISTS tally_data_all AS
+    SELECT t.*, NULL AS archived_at FROM tally_data t
+    UNION ALL
+    SELECT * FROM tally_data_archive;
+
+CREATE INDEX IF NOT EXISTS idx_tally_data_match_status ON tally_data (match_status, lender);
+CREATE INDEX IF NOT EXISTS idx_tally_data_matched_with ON tally_data (matched_with);
+CREATE INDEX IF NOT EXISTS idx_tally_data_date ON tally_data (Date);
+CREATE INDEX IF NOT EXISTS idx_tally_data_row_version ON tally_data (row_version);
+CREATE INDEX IF NOT EXISTS idx_tally_data_period ON tally_data (statement_year, statement_month);
+CREATE INDEX IF NOT EXISTS idx_tally_data_summary_group ON tally_data (lender, statement_year, statement_month);
+CREATE INDEX IF NOT EXISTS idx_archive_period ON tally_data_archive (statement_year, statement_month);
+CREATE INDEX IF NOT EXISTS idx_archive_matched_with ON tally_data_archive (matched_with);
+CREATE INDEX IF NOT EXISTS idx_pairs_archive_reviewed ON reconciliation_pairs_archive (reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_tally_data_removed_version ON tally_data_removed (row_version);
+CREATE INDEX IF NOT EXISTS idx_pairs_status ON reconciliation_pairs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_pairs_debit_uid ON reconciliation_pairs (debit_uid);
+CREATE INDEX IF NOT EXISTS idx_pairs_credit_uid ON reconciliation_pairs (credit_uid);
+"""
+
+
+class StorageBackend:
+    """Engine-specific pieces of the storage layer"""
+
+    name = None
+    # SQL expression for the current local timestamp
+    now_sql = 'NOW()'
+
+    def __init__(self):
+        self.engine = self.create_engine()
+
+    def create_engine(self):
+        raise NotImplementedError
+
+    def ensure_table_exists(self, table_name):
+        inspector = inspect(self.engine)
+        if table_name not in inspector.get_table_names():
+            raise Exception(
+                f"Table '{table_name}' does not exist. Please create it manually in MySQL before uploading."
+            )
+
+    def get_columns(self, table_name):
+        """Return column names of a table in definition order"""
+        return [column['name'] for column in inspect(self.engine).get_columns(table_name)]
+
+    def insert_dataframe(self, df, table_name, conn=None):
+        """Append a DataFrame to a table, inside the caller's transaction when conn is given"""
+        df.to_sql(table_name, conn or self.engine, if_exists='append', index=False)
+
+
+class MySQLBackend(StorageBackend):
+    """MySQL server accessed through PyMySQL"""
+
+    name = 'mysql'
+    now_sql = 'NOW()'
+    # Rows per multi-row INSERT; keeps packets well under max_allowed_packet
+    insert_chunksize = 1000
+
+    def create_engine(self):
+        return create_engine(
+            f'mysql+pymysql://{config.MYSQL_USER}:{config.MYSQL_PASSWORD}@{config.MYSQL_HOST}/{config.MYSQL_DB}',
+            pool_pre_ping=True,
+            pool_recycle=3600
+        )
+
+    def get_columns(self, table_name):
+        with self.engine.connect() as conn:
+            result = conn.execute(text(f"SHOW COLUMNS FROM {table_name}"))
+            return [row[0] for row in result]
+
+    def insert_dataframe(self, df, table_name, conn=None):
+        # One round trip per chunk instead of one per row
+        df.to_sql(table_name, conn or self.engine, if_exists='append', index=False,
+                  method='multi', chunksize=self.insert_chunksize)
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite database file in WAL mode, no server required"""
+
+    name = 'sqlite'
+    now_sql = "datetime('now', 'localtime')"
+
+    def create_engine(self):
+        engine = create_engine(f'sqlite:///{config.SQLITE_PATH}')
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.execute('PRAGMA cache_size=-65536')
+            cursor.execute('PRAGMA busy_timeout=5000')
+            cursor.close()
+
+        return engine
+
+    def ensure_table_exists(self, table_name):
+        # The embedded database owns its schema, so create it on first use
+        inspector = inspect(self.engine)
+        if table_name not in inspector.get_table_names():
+            with self.engine.begin() as conn:
+                for statement in SQLITE_SCHEMA.split(';'):
+                    if statement.strip():
+                        conn.execute(text(statement))
+
+    def get_columns(self, table_name):
+        with self.engine.connect() as conn:
+            result = conn.execute(text(f"PRAGMA table_info({table_name})"))
+            return [row[1] for row in result]
+
+    def insert_dataframe(self, df, table_name, conn=None):
+        # executemany inside a single transaction is the fastest path for SQLite
+        df.to_sql(table_name, conn or self.engine, if_exists='append', index=False)
+
+
+BACKENDS = {
+    MySQLBackend.name: MySQLBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def get_backend(name=None):
+    """Create the storage backend selected in config.DB_BACKEND"""
+    name = name or config.DB_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND '{name}'. Expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
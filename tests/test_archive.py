@@ -0,0 +1,94 @@
+import importlib
+import pandas as pd
+import pytest
+import config
+import metrics
+
+ARCHIVE_STAGE = (('stage', 'archive_closed_periods'),)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # A fresh embedded database per test
+    monkeypatch.setattr(config, 'DB_BACKEND', 'sqlite')
+    monkeypatch.setattr(config, 'SQLITE_PATH', str(tmp_path / 'recon.db'))
+    import database
+    database = importlib.reload(database)
+    yield database
+    database.engine.dispose()
+
+
+def statement(lender, borrower, amounts, side):
+    """Parser-shaped rows of one January 2024 ledger"""
+    return pd.DataFrame([{
+        'tally_uid': f'{lender}_{i:06d}',
+        'lender': lender,
+        'borrower': borrower,
+        'statement_month': 'January',
+        'statement_year': '2024',
+        'Date': f'2024-01-{i + 1:02d}',
+        'dr_cr': 'By' if side == 'Credit' else 'To',
+        'Particulars': f'Loan transfer FOB/PO/2023/8/{5000 + i}',
+        'Vch_Type': 'Journal',
+        'Vch_No': f'J{i}',
+        'Debit': str(amount) if side == 'Debit' else None,
+        'Credit': str(amount) if side == 'Credit' else None,
+        'entered_by': '',
+    } for i, amount in enumerate(amounts)])
+
+
+def load_and_confirm(database, amounts):
+    assert database.save_data(statement('Steel', 'GeoTex', amounts, 'Credit'))
+    assert database.save_data(statement('GeoTex', 'Steel', amounts, 'Debit'))
+    matches = database.update_matches(database.find_matches(database.get_unmatched_data()))
+    assert len(matches) == len(amounts)
+    for match in database.get_matched_data():
+        database.update_match_status(match['tally_uid'], 'confirmed', 'tester')
+    return matches
+
+
+def archive_samples():
+    entry = metrics.stage_seconds.values.get(ARCHIVE_STAGE)
+    return entry['count'] if entry else 0
+
+
+def test_archive_moves_confirmed_pairs(database):
+    matches = load_and_confirm(database, [1000, 2500, 4000])
+    version = database.get_data_version()
+    samples = archive_samples()
+
+    # Several batches still make one timed archive job
+    assert database.archive_closed_periods((2024, 2), batch_size=1) == 3
+    assert archive_samples() == samples + 1
+
+    archived = database.get_archived_matches()
+    assert len(archived) == 3
+    assert {row['tally_uid'] for row in archived} == {match['credit_id'] for match in matches}
+    assert database.get_matched_data() == []
+
+    removed = database.get_removed_uids(version)
+    assert sorted(removed) == sorted([m['credit_id'] for m in matches] + [m['debit_id'] for m in matches])
+    assert database.get_removed_uids(database.get_data_version()) == []
+
+
+def test_archive_skips_open_periods(database):
+    load_and_confirm(database, [1000])
+    assert database.archive_closed_periods((2024, 1)) == 0
+    assert len(database.get_matched_data()) == 1
+
+
+def test_archived_statement_cannot_be_loaded_again(database):
+    load_and_confirm(database, [1000, 2500])
+    assert database.archive_closed_periods((2024, 2)) == 2
+    version = database.get_data_version()
+    summary = database.get_unmatched_summary()
+
+    # The closed period must not come back as open unmatched items
+    assert not database.save_data(statement('Steel', 'GeoTex', [1000, 2500], 'Credit'))
+    assert database.get_data() == []
+    assert database.get_data_version() == version
+    assert database.get_unmatched_summary() == summary
+
+    # Archiving again finds nothing to move instead of failing on the archive's unique uid
+    assert database.archive_closed_periods((2024, 2)) == 0
+    assert len(database.get_archived_matches()) == 2
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+import metrics
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stage_count(text, stage):
+    for line in text.splitlines():
+        if line.startswith(f'recon_stage_rows_total{{stage="{stage}"}} '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_single_process_needs_no_fcntl():
+    # fcntl is only used by the gunicorn multiprocess mode
+    code = ("import sys; sys.modules['fcntl'] = None; import metrics; "
+            "metrics.count_rows('x', 1); print(metrics.render())")
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert 'recon_stage_rows_total{stage="x"} 1' in result.stdout
+
+
+def test_multiprocess_totals_survive_worker_exit(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    metrics.clear_multiprocess_dir(directory)
+    monkeypatch.setattr(metrics, '_multiprocess_dir', directory)
+    metrics.count_rows('mp_test', 3)
+
+    # Another worker's snapshot, as written by its flush thread
+    with open(os.path.join(directory, '999999.json'), 'w') as f:
+        json.dump(metrics._snapshot([metrics.stage_rows]), f)
+    own = metrics.stage_rows.values[(('stage', 'mp_test'),)]
+
+    assert stage_count(metrics.render(), 'mp_test') == 2 * own
+    metrics.mark_process_dead(999999, directory)
+    assert not os.path.exists(os.path.join(directory, '999999.json'))
+    assert stage_count(metrics.render(), 'mp_test') == 2 * own
@@ -0,0 +1,65 @@
+"""Golden-file check of parse_tally_file
+
+tally_golden.xlsx holds the awkward cases the parser has to get right:
+negative, comma-formatted, blank, non-numeric, very large and
+half-rounding amounts, continuation lines, "Entered By" rows and a
+duplicated column. tally_golden_expected.json is the output of the
+row-at-a-time parser the vectorized one replaced; regenerate it with
+`python tests/test_parser_golden.py` only when the output is meant to
+change.
+"""
+
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parser.tally_parser_interunit_loan_recon import parse_tally_file
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+WORKBOOK = os.path.join(FIXTURES, 'tally_golden.xlsx')
+EXPECTED = os.path.join(FIXTURES, 'tally_golden_expected.json')
+SHEETS = ('Cotton', 'Steel')
+
+
+def snapshot(df):
+    """Index, columns, dtypes and every cell as (type, repr)"""
+    return {
+        'index': [repr(i) for i in df.index],
+        'columns': list(df.columns),
+        'dtypes': [str(dtype) for dtype in df.dtypes],
+        'cells': [[[type(value).__name__, repr(value)] for value in row] for row in df.itertuples(index=False)],
+    }
+
+
+def load_expected():
+    with open(EXPECTED, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('sheet_name', SHEETS)
+def test_parse_matches_golden(sheet_name):
+    expected = load_expected()[sheet_name]
+    actual = snapshot(parse_tally_file(WORKBOOK, sheet_name))
+
+    assert actual['columns'] == expected['columns']
+    assert actual['dtypes'] == expected['dtypes']
+    assert actual['index'] == expected['index']
+    for row, (actual_row, expected_row) in enumerate(zip(actual['cells'], expected['cells'])):
+        for column, actual_cell, expected_cell in zip(actual['columns'], actual_row, expected_row):
+            assert actual_cell == expected_cell, f"row {row}, column {column}"
+    assert len(actual['cells']) == len(expected['cells'])
+
+
+@pytest.mark.parametrize('sheet_name', SHEETS)
+def test_parse_from_buffer_matches_golden(sheet_name):
+    with open(WORKBOOK, 'rb') as f:
+        actual = snapshot(parse_tally_file(f, sheet_name))
+    assert actual == load_expected()[sheet_name]
+
+
+if __name__ == '__main__':
+    with open(EXPECTED, 'w', encoding='utf-8') as f:
+        json.dump({name: snapshot(parse_tally_file(WORKBOOK, name)) for name in SHEETS}, f, indent=1)
+        f.write('\n')
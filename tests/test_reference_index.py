@@ -0,0 +1,68 @@
+import random
+import reference_index
+from reference_index import ReferenceIndex, fuzzy_reference_pairs, transposition_distance
+
+
+def sequential_references(count):
+    return [f"FOB/PO/2023/8/{10000 + i}" for i in range(count)]
+
+
+def test_transposition_distance():
+    assert transposition_distance("FOB/PO/2023/8/5023", "FOB/PO/2023/8/5032", 1) == 1
+    assert transposition_distance("FOB/PO/2023/8/5023", "FOB/PO/2023/8/5023", 1) == 0
+    # A different serial is a different PO, not a typo
+    assert transposition_distance("FOB/PO/2023/8/5023", "FOB/PO/2023/8/5024", 1) is None
+    assert transposition_distance("FOB/PO/2023/8/5023", "FOB/PO/2023/8/502", 1) is None
+    assert transposition_distance("0213", "2031", 1) is None
+    assert transposition_distance("0213", "2031", 2) == 2
+
+
+def test_index_prunes_shared_prefix_references():
+    references = sequential_references(2000)
+    index = ReferenceIndex(max_swaps=1)
+    for key, reference in enumerate(references):
+        index.add(key, reference)
+
+    for reference in references:
+        # Only the reference itself and its single-swap variants are read,
+        # never the other references sharing the FOB/PO/2023/8/ prefix
+        candidates = index.candidates(reference)
+        assert reference in {references[entry] for entry in candidates}
+        assert all(transposition_distance(reference, references[entry], 1) is not None
+                   for entry in candidates)
+
+    assert {key for key, _, _ in index.search("FOB/PO/2023/8/10021")} == {21, 12, 201}
+
+
+def test_index_matches_pairwise_scan():
+    rng = random.Random(7)
+    references = sequential_references(300)
+    queries = []
+    for reference in rng.sample(references, 100):
+        chars = list(reference)
+        i = rng.randrange(len(chars) - 1)
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        queries.append("".join(chars))
+
+    for max_swaps in (1, 2):
+        index = ReferenceIndex(max_swaps)
+        for key, reference in enumerate(references):
+            index.add(key, reference)
+        for query in queries:
+            expected = {key for key, reference in enumerate(references)
+                        if transposition_distance(query, reference, max_swaps) is not None}
+            assert {key for key, _, _ in index.search(query)} == expected
+
+
+def test_fuzzy_reference_pairs_same_amount_only():
+    credits = [("c1", 100.0, "Loan FOB/PO/2023/8/5023 paid"), ("c2", 250.0, "FOB/PO/2023/8/5023")]
+    debits = [("d1", 100.0, "Loan FOB/PO/2023/8/5032"), ("d2", 100.0, "Loan FOB/PO/2023/8/5024"),
+              ("d3", 999.0, "FOB/PO/2023/8/5032")]
+    pairs = fuzzy_reference_pairs(credits, debits, 1)
+    assert pairs == {("c1", "d1"): (1, "FOB/PO/2023/8/5023", "FOB/PO/2023/8/5032")}
+    assert fuzzy_reference_pairs(credits, debits, 0) == {}
+
+
+def test_fuzzy_score_below_confirmed_band():
+    assert reference_index.fuzzy_score(1) < 0.7
+    assert reference_index.fuzzy_score(2) < reference_index.fuzzy_score(1)
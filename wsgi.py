@@ -0,0 +1,12 @@
+"""WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py runs prefork workers with a few threads each, so long
+reconciles and uploads no longer block the read endpoints. `python app.py`
+remains the development server.
+"""
+
+from app import app
+
+application = app